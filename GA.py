@@ -1,70 +1,69 @@
 
-import random
+import bisect
+import itertools
+import numpy as np
 from pathlib import Path
+from instancia import como_instancia
+from punto_control import guardar_punto_control, cargar_punto_control, firma_punto_control
+from parada import CriterioParada, rellenar_historial
+from perfil import crear_perfil
 
-def generate_random_value():
-    return random.randint(0, 1)
+def apply_balanced_mutations(chromosome, positions, values, weights, max_weight, weight, rng):
+    """
+    Aplica la mutación balanceada en las posiciones indicadas, en orden.
+    Añadir un ítem solo se acepta si cabe o si cabe tras quitar un ítem
+    seleccionado al azar entre los que liberan suficiente espacio; quitar
+    un ítem siempre es factible.
 
-def create_individual(n_items):
-    return [generate_random_value() for _ in range(n_items)]
+    El peso del cromosoma se actualiza en O(1) por cambio y los candidatos al
+    intercambio se buscan con bisect en la lista de ítems seleccionados ordenada
+    por peso, que solo se construye si hace falta un intercambio.
 
-def compute_fitness(chromosome, values, weights, max_weight):
-    value = sum([chromosome[i] * values[i] for i in range(len(chromosome))])
-    weight = sum([chromosome[i] * weights[i] for i in range(len(chromosome))])
-    if weight > max_weight:
-        return 0
-    else:
-        return value
-
-def compute_weight(chromosome, weights):
-    return sum([chromosome[i] * weights[i] for i in range(len(chromosome))])
-
-def selection(population, fitness_scores):
-    selected_chromosomes = []
-    population_size = len(population)
-    # Si todos los fitness son cero (población totalmente inviable), seleccion aleatoria
-    if max(fitness_scores) == 0:
-        return random.sample(population, population_size // 2)
-    for i in range(population_size // 2):
-        max_fitness_index = fitness_scores.index(max(fitness_scores))
-        selected_chromosomes.append(population[max_fitness_index])
-        fitness_scores[max_fitness_index] = 0
-    return selected_chromosomes
-
-def crossover(parent1, parent2):
-    split_index = random.randint(1, len(parent1)-1)
-    child1 = parent1[:split_index] + parent2[split_index:]
-    child2 = parent2[:split_index] + parent1[split_index:]
-    return child1, child2
-
-def mutate_balanced(chromosome, mutation_rate, values, weights, max_weight):
-    for i in range(len(chromosome)):
-        if random.uniform(0, 1) < mutation_rate:
-            if chromosome[i] == 0:
-                # intenta añadir el ítem
-                if compute_weight(chromosome, weights) + weights[i] <= max_weight:
-                    chromosome[i] = 1
-                else:
-                    # intenta liberar espacio: eliminar algún ítem aleatorio
-                    ones = [j for j in range(len(chromosome)) if chromosome[j] == 1 and j != i]
-                    random.shuffle(ones)
-                    for j in ones:
-                        if compute_weight(chromosome, weights) - weights[j] + weights[i] <= max_weight:
-                            chromosome[j] = 0
-                            chromosome[i] = 1
-                            break
+    Args:
+        weight (int | None): peso actual del cromosoma, o None para calcularlo.
+        rng (np.random.Generator): generador para elegir el ítem a quitar.
+    """
+    if weight is None:
+        weight = int(np.dot(chromosome, weights))
+    selected = None
+    for i in positions:
+        weight_i = int(weights[i])
+        if chromosome[i] == 0:
+            # intenta añadir el ítem
+            if weight + weight_i <= max_weight:
+                chromosome[i] = 1
+                weight += weight_i
+                if selected is not None:
+                    bisect.insort(selected, (weight_i, i))
             else:
-                # quitar el ítem siempre es factible
-                chromosome[i] = 0
+                # intenta liberar espacio: eliminar un ítem aleatorio de los que bastan
+                if selected is None:
+                    ones = np.flatnonzero(chromosome)
+                    ones = ones[np.argsort(np.take(weights, ones), kind='stable')]
+                    selected = list(zip(np.take(weights, ones).tolist(), ones.tolist()))
+                start = bisect.bisect_left(selected, (weight + weight_i - max_weight, -1))
+                if start < len(selected):
+                    k = int(rng.integers(start, len(selected)))
+                    weight_j, j = selected.pop(k)
+                    chromosome[j] = 0
+                    chromosome[i] = 1
+                    weight += weight_i - weight_j
+                    bisect.insort(selected, (weight_i, i))
+        else:
+            # quitar el ítem siempre es factible
+            chromosome[i] = 0
+            weight -= weight_i
+            if selected is not None:
+                del selected[bisect.bisect_left(selected, (weight_i, i))]
     return chromosome
 
-def create_feasible_individual(n_items, values, weights, max_weight):
+def create_feasible_individual(n_items, values, weights, max_weight, rng):
     """
     Genera un individuo factible usando un enfoque goloso aleatorio.
+    El orden aleatorio se toma de rng (np.random.Generator).
     """
     individual = [0]*n_items
-    idxs = list(range(n_items))
-    random.shuffle(idxs)
+    idxs = rng.permutation(n_items).tolist()
     current_weight = 0
     for i in idxs:
         if current_weight + weights[i] <= max_weight:
@@ -72,71 +71,205 @@ def create_feasible_individual(n_items, values, weights, max_weight):
             current_weight += weights[i]
     return individual
 
-def genetic_algorithm(file_path, population_size=100, generations=100, mutation_rate=0.1):
+def compute_population_fitness(population, table, max_weight):
+    """
+    Calcula valor, peso y fitness de toda la población con un único producto matricial.
+
+    Args:
+        population (np.ndarray): matriz (P, n) de cromosomas.
+        table (np.ndarray): matriz (n, 2) en coma flotante con los valores y pesos.
+        max_weight (int): capacidad de la mochila.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: fitness, valor y peso de cada cromosoma
+        (el fitness es 0 si el cromosoma excede la capacidad).
+    """
+    totals = (population @ table).astype(np.int64)
+    value, weight = totals[:, 0], totals[:, 1]
+    return np.where(weight > max_weight, 0, value), value, weight
+
+def select_population(population, fitness_scores, rng):
+    """
+    Selecciona la mitad de la población con mayor fitness usando argpartition.
+    Si todos los fitness son cero (población totalmente inviable), la selección es aleatoria.
+    """
+    half = len(population) // 2
+    if fitness_scores.max() == 0:
+        return population[rng.choice(len(population), half, replace=False)]
+    return population[np.argpartition(-fitness_scores, half - 1)[:half]]
+
+def crossover_population(selected_chromosomes, n_pairs, rng):
+    """
+    Cruza n_pairs parejas de padres elegidas al azar entre los seleccionados
+    con un punto de corte por pareja, aplicado como máscara.
+    """
+    n_items = selected_chromosomes.shape[1]
+    parents = rng.integers(0, len(selected_chromosomes), (2, n_pairs))
+    parents1 = selected_chromosomes[parents[0]]
+    parents2 = selected_chromosomes[parents[1]]
+    split_index = rng.integers(1, n_items, n_pairs)
+    mask = np.arange(n_items) < split_index[:, None]
+    child1 = np.where(mask, parents1, parents2)
+    child2 = np.where(mask, parents2, parents1)
+    return np.stack((child1, child2), axis=1).reshape(-1, n_items)
+
+def mutate_population(population, mutation_rate, values, weights, max_weight, rng, profiler=None):
+    """
+    Sortea con una única máscara aleatoria los bits que mutan en toda la población
+    y aplica la mutación balanceada solo en esas posiciones.
+    Con profiler (perfil.Perfil) cuenta los bits sorteados y los objetos quitados y añadidos.
+    """
+    mask = rng.random(population.shape) < mutation_rate
+    population_weights = population @ weights
+    rows = np.flatnonzero(mask.any(axis=1))
+    if profiler:
+        before = population[rows] != 0
+    for row in rows:
+        apply_balanced_mutations(population[row], np.flatnonzero(mask[row]).tolist(), values, weights, max_weight,
+                                 int(population_weights[row]), rng)
+    if profiler:
+        after = population[rows] != 0
+        profiler.contar('mutaciones', np.count_nonzero(mask))
+        profiler.contar('objetos_quitados', np.count_nonzero(before & ~after))
+        profiler.contar('objetos_anadidos', np.count_nonzero(after & ~before))
+    return population
+
+def genetic_algorithm(file_path, population_size=100, generations=100, mutation_rate=0.1, seed=None,
+                      checkpoint=None, checkpoint_every=100, target=None, stop_at_optimum=False, max_stagnation=None,
+                      time_budget=None, profile=None):
     """
     Ejecuta el algoritmo genético del problema de la mochila leyendo la instancia desde un archivo.
+    La población se guarda como una matriz (P, n) de uint8.
 
     Args:
-        file_path (str): ruta al archivo de datos de la instancia.
+        file_path (str | Instancia): ruta al archivo de datos de la instancia o la instancia ya cargada.
         population_size (int): tamaño de la población.
-        generations (int): número de generaciones.
+        generations (int | None): número de generaciones (None: sin límite, para por
+            time_budget u otro criterio).
         mutation_rate (float): probabilidad de mutación.
+        seed (int | np.random.SeedSequence | np.random.Generator, opcional): semilla o
+            generador de la ejecución; por defecto, entropía nueva del sistema.
+        checkpoint (str | Path, opcional): archivo .npz donde se guarda la población y el
+            estado del generador cada checkpoint_every generaciones; si existe, la
+            ejecución se reanuda desde él.
+        checkpoint_every (int): generaciones entre puntos de control.
+        target (int, opcional): parar al alcanzar este fitness.
+        stop_at_optimum (bool): parar al alcanzar el óptimo z de la instancia (si se conoce).
+        max_stagnation (int, opcional): parar tras tantas generaciones sin mejorar el mejor fitness.
+        time_budget (float, opcional): segundos de tiempo real; al agotarlos se devuelve la
+            mejor solución encontrada hasta el momento.
+        profile (bool | callable | perfil.Perfil, opcional): perfilado por fases (evaluar,
+            seleccionar, cruzar, mutar) y contador de mutaciones; ver perfil.crear_perfil.
 
     Returns:
-        List[int]: historial de fitness máximo por generación.
+        Tuple[dict, List[int]]: mejor solución encontrada en toda la ejecución (items, value, weight, stop, el criterio de
+        parada de parada.CRITERIOS_PARADA, y times, los segundos transcurridos en cada
+        generación del historial; con profile, también profile, el resumen del perfil) e historial de fitness máximo
+        de la población inicial y de cada generación (generations + 1 valores, como los solvers cuánticos),
+        completado con el último valor si la ejecución paró antes; value es siempre su máximo.
     """
-    n_items, values, weights, max_weight = load_input_from_file(file_path)
+    if generations is None and time_budget is None:
+        raise ValueError('hace falta un número de generaciones o un tiempo límite')
+    instance = como_instancia(file_path)
+    n_items, max_weight = len(instance), instance.capacidad
+    # the columns of a .knap file may be int32: sums of 10**5 weights would overflow
+    values = np.ascontiguousarray(instance.valores, dtype=np.int64)
+    weights = np.ascontiguousarray(instance.pesos, dtype=np.int64)
+    rng = np.random.default_rng(seed)
+    table = np.column_stack((values, weights)).astype(np.float64)
+
     # create the initial population
-    population = []
-    for _ in range(population_size):
-        ind = create_individual(n_items)
-        # si no es factible, sustituir por individuo goloso aleatorio
-        if compute_fitness(ind, values, weights, max_weight) == 0:
-            ind = create_feasible_individual(n_items, values, weights, max_weight)
-        population.append(ind)
+    population = rng.integers(0, 2, (population_size, n_items), dtype=np.uint8)
+    fitness_scores, _, _ = compute_population_fitness(population, table, max_weight)
+    # si no es factible, sustituir por individuo goloso aleatorio
+    for i in np.flatnonzero(fitness_scores == 0):
+        population[i] = create_feasible_individual(n_items, values, weights, max_weight, rng)
     historial_soluciones = []
+    start = 0
+    stopping = CriterioParada(target, instance.optimo if stop_at_optimum else None, max_stagnation,
+                              tiempo_limite=time_budget)
+    times = []
+    profiler = crear_perfil(profile)
+    stop = 'iteraciones'
+    best_fitness, stagnation = -1, 0
+    # best chromosome seen so far: without elitism the last population may have lost it
+    best_chromosome, best_weight = None, 0
+
+    # resume from the checkpoint of this run, if any
+    if checkpoint is not None:
+        signature = firma_punto_control('GA', instance, population_size=population_size, mutation_rate=mutation_rate)
+        state = cargar_punto_control(checkpoint, signature, rng)
+        if state is not None:
+            population = state['population']
+            historial_soluciones = state['history'].tolist()
+            start = int(state['generation'])
+            best_fitness, stagnation = int(state['best_fitness']), int(state['stagnation'])
+            best_chromosome, best_weight = state['best_chromosome'], int(state['best_weight'])
+            times = state['times'].tolist()
+            if times:
+                stopping.reanudar(times[-1])
 
     # run the genetic algorithm for the specified number of generations
-    for generation in range(generations):
+    for generation in (itertools.count(start) if generations is None else range(start, generations)):
         # calculate the fitness of each chromosome in the population
-        fitness_scores = [compute_fitness(chromosome, values, weights, max_weight) for chromosome in population]
-        #print(fitness_scores)
-        max_fitness_index = fitness_scores.index(max(fitness_scores))
-        historial_soluciones.append(fitness_scores[max_fitness_index])
+        t = profiler.marca() if profiler else 0
+        fitness_scores, _, weight = compute_population_fitness(population, table, max_weight)
+        if profiler: t = profiler.fase('evaluar', t)
+        historial_soluciones.append(int(fitness_scores.max()))
+        times.append(stopping.transcurrido())
+        if historial_soluciones[-1] > best_fitness:
+            best_fitness, stagnation = historial_soluciones[-1], 0
+            best = int(np.argmax(fitness_scores))
+            best_chromosome, best_weight = population[best].copy(), int(weight[best])
+        else:
+            stagnation += 1
+        reason = stopping.comprobar(best_fitness, stagnation)
+        if reason is not None:
+            stop = reason
+            break
         # select the top chromosomes for reproduction
-        selected_chromosomes = selection(population, fitness_scores)
+        selected_chromosomes = select_population(population, fitness_scores, rng)
+        if profiler: t = profiler.fase('seleccionar', t)
 
         # crossover the selected chromosomes to create new offspring
-        offspring = []
-        for i in range(population_size // 2):
-            parent1 = selected_chromosomes[random.randint(0, len(selected_chromosomes)-1)]
-            parent2 = selected_chromosomes[random.randint(0, len(selected_chromosomes)-1)]
-            child1, child2 = crossover(parent1, parent2)
-            offspring.extend([child1, child2])
+        offspring = crossover_population(selected_chromosomes, population_size // 2, rng)
+        if profiler: t = profiler.fase('cruzar', t)
 
         # mutate the offspring
-        for i in range(len(offspring)):
-           offspring[i] = mutate_balanced(offspring[i], mutation_rate,values,weights,max_weight)
+        offspring = mutate_population(offspring, mutation_rate, values, weights, max_weight, rng, profiler)
+        if profiler: profiler.fase('mutar', t)
 
         # replace the old population with the new offspring
         population = offspring
 
-    # find the chromosome with the highest fitness score
-    best_chromosome = population[0]
-    best_fitness_score = compute_fitness(best_chromosome, values, weights, max_weight)
-    for chromosome in population:
-        fitness_score = compute_fitness(chromosome, values, weights, max_weight)
-        if fitness_score > best_fitness_score:
-            best_chromosome = chromosome
-            best_fitness_score = fitness_score
-
-    # return the solution
-    selected_items = [i+1 for i in range(n_items) if best_chromosome[i] == 1]
+        if checkpoint is not None and (generation + 1) % checkpoint_every == 0:
+            guardar_punto_control(checkpoint, signature, rng, population=population, generation=generation + 1,
+                                  history=np.array(historial_soluciones, dtype=np.int64),
+                                  best_fitness=best_fitness, stagnation=stagnation, best_chromosome=best_chromosome,
+                                  best_weight=best_weight, times=np.array(times))
+    else:
+        # every generation ran: the last offspring has not been evaluated yet, it
+        # gets its own history entry so that the returned value is always in the history
+        fitness_scores, _, weight = compute_population_fitness(population, table, max_weight)
+        historial_soluciones.append(int(fitness_scores.max()))
+        times.append(stopping.transcurrido())
+        best = int(np.argmax(fitness_scores))
+        if fitness_scores[best] > best_fitness:
+            best_fitness, best_chromosome, best_weight = int(fitness_scores[best]), population[best], int(weight[best])
+
+    # return the best solution found
     solution = {
-        'items': selected_items,
-        'value': best_fitness_score,
-        'weight': compute_weight(best_chromosome, weights)
+        'items': (np.flatnonzero(best_chromosome) + 1).tolist(),
+        'value': int(best_fitness),
+        'weight': best_weight,
+        'stop': stop,
+        'times': times
     }
+    if profiler:
+        profiler.terminar()
+        solution['profile'] = profiler.resumen()
+    if generations is not None:
+        historial_soluciones = rellenar_historial(historial_soluciones, generations + 1)
     return solution, historial_soluciones
 
 
@@ -150,34 +283,19 @@ def load_input_from_file(file_path):
       idx,value,weight,0
       ...
 
+    La lectura la hace instancia.cargar_instancia, que mantiene una caché binaria junto al archivo.
+
     Args:
         file_path (str): ruta al archivo de datos.
 
     Returns:
         Tuple[int, List[int], List[int], int]: n_items, values, weights, max_weight
     """
-    values = []
-    weights = []
-    n_items = 0
-    max_weight = 0
-
-    with open(file_path, 'r') as f:
-        lines = [line.strip() for line in f if line.strip()]
-    # Cabecera
-    idx = 0
-    while idx < len(lines) and ' ' in lines[idx]:
-        key, val = lines[idx].split()
-        if key == 'n':
-            n_items = int(val)
-        elif key == 'c':
-            max_weight = int(val)
-        idx += 1
-    # Ítems
-    for line in lines[idx:]:
-        parts = line.split(',')
-        if len(parts) >= 3:
-            values.append(int(parts[1]))
-            weights.append(int(parts[2]))
+    instance = como_instancia(file_path)
+    values = instance.valores.tolist()
+    weights = instance.pesos.tolist()
+    n_items = len(instance)
+    max_weight = instance.capacidad
     return n_items, values, weights, max_weight
 
 #instancia_mochila = Path('./data/toyProblemInstance_100.csv')
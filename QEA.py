@@ -1,65 +1,23 @@
 import numpy as np
-import math
 from pathlib import Path
 import matplotlib as plt
-import copy
+from reparacion import Reparador
+from registro_cuantico import crear_registro
+from instancia import como_instancia
+from punto_control import guardar_punto_control, cargar_punto_control, firma_punto_control
+from parada import CriterioParada, rellenar_historial
+from perfil import crear_perfil
+from cache_evaluacion import CacheEvaluacion
+from archivo_elite import ArchivoElite
 
 class QEA:
-    class QObjeto:
-        """Abstracción de la representación de un qubit como un "objeto cuántico" del problema de la mochila.
-        
-        Atributos
-        ----------
-        valor : int
-            Valor del objeto representado por el qubit.
-        peso : int
-            Peso del objeto representado por el qubit.
-        alpha : float, opcional
-            Valor alpha de la representación del qubit (por defecto math.sqrt(1/2)).
-        beta : float, opcional
-            Valor beta de la representación del qubit (por defecto math.sqrt(1/2)).
-        """
-        
-        def __init__(self, valor=None, peso=None, alpha=math.sqrt(1/2), beta=math.sqrt(1/2)):
-            self.alpha = alpha
-            self.beta = beta
-            self.valor = valor
-            self.peso = peso
-        
-        def medir(self):
-            """Mide el valor del qubit comparando con un número aleatorio entre [0,1).
-            
-            Retorna
-            -------
-            medicion : int
-                0 o 1 dependiendo del qubit (alpha y beta) y el número aleatorio generado.
-            """
-            return 1 if np.random.random_sample() < self.beta**2 else 0
-        
-        def actualizar(self, matriz):
-            """Actualiza los valores alpha y beta del qubit aplicando una matriz.
-            
-            Parámetros
-            ----------
-            matriz :
-                Matriz bidimensional (compuerta cuántica) para aplicar al qubit.
-            """
-            alpha_old = self.alpha
-            beta_old = self.beta
-            self.alpha = matriz[0][0] * alpha_old + matriz[0][1] * beta_old
-            self.beta = matriz[1][0] * alpha_old + matriz[1][1] * beta_old
-
-    def crear_matriz_rotacion(self,angulo):
-        """Genera una matriz de rotación para operar en un QObjeto con el ángulo dado."""
-        return [[math.cos(angulo), -math.sin(angulo)], [math.sin(angulo), math.cos(angulo)]]
-
     def medir_poblacion(self,poblacion_q):
-        """Mide cada qubit de la población de ObjetosCuanticos y devuelve el resultado."""
-        return [q.medir() for q in poblacion_q]
+        """Mide cada qubit del registro cuántico y devuelve el resultado."""
+        return poblacion_q.medir(self.rng)
     
     def migrar(self,b,B):
-        for i,(solucion,valor,peso) in enumerate(B):
-            B[i] = b
+        #b es siempre la primera solución de B(t)
+        B.migrar()
 
 
     def evaluar_solucion(self,poblacion_q, solucion):
@@ -67,9 +25,9 @@ class QEA:
         
         Parámetros
         ----------
-        poblacion_q : [QObjeto]
-            Población de ObjetosCuanticos.
-        solucion : [int]
+        poblacion_q : RegistroCuantico
+            Registro de qubits de la instancia.
+        solucion : np.ndarray
             Solución obtenida de una medición de la población.
             
         Retorna
@@ -79,25 +37,19 @@ class QEA:
         peso : int
             Peso total de la solución evaluada.
         """
-        valor_total = 0
-        peso_total = 0
-
-        for i, medida in enumerate(solucion):
-            valor_total += medida*(poblacion_q[i].valor)
-            peso_total += medida*(poblacion_q[i].peso)
-        
-        return valor_total, peso_total
+        return poblacion_q.evaluar(solucion)
 
     def reparar_solucion(self,poblacion_q, solucion, capacidad_max, valor_actual, peso_actual):
         """Repara la solución para hacerla válida.
-        Si la suma de los pesos excede el límite, 
-        elimina objetos al azar hasta satisfacer la restricción.
+        Si la suma de los pesos excede el límite, elimina objetos hasta satisfacer
+        la restricción y rellena con los que quepan, según el modo de reparación
+        del solver ('eficiencia' o 'aleatoria', ver reparacion.Reparador).
         
         Parámetros
         ----------
-        poblacion_q : [QObjeto]
-            Población de ObjetosCuanticos.
-        solucion : [int]
+        poblacion_q : RegistroCuantico
+            Registro de qubits de la instancia.
+        solucion : np.ndarray
             Solución obtenida de una medición de la población.
         capacidad_max : int
             Capacidad máxima de peso de la mochila.
@@ -113,36 +65,16 @@ class QEA:
         peso_actual : int
             Peso total de la solución reparada.
         """
-        while peso_actual > capacidad_max:
-            indice = np.random.randint(0, len(solucion))
-            if solucion[indice]:
-                solucion[indice] = 0
-                valor_actual -= poblacion_q[indice].valor
-                peso_actual -= poblacion_q[indice].peso
-                
-        # Luego intenta rellenar objetos que quepan, de forma codiciosa
-        anyadido = True
-        while anyadido:
-            anyadido = False
-            for i in range(len(solucion)):
-                if solucion[i] == 0 and peso_actual + poblacion_q[i].peso <= capacidad_max:
-                    solucion[i] = 1
-                    valor_actual += poblacion_q[i].valor
-                    peso_actual += poblacion_q[i].peso
-                    anyadido = True
-                    break
-        
-        
-        return valor_actual, peso_actual
+        return self.reparador.reparar(solucion, capacidad_max, valor_actual, peso_actual)
 
     def evaluar_y_reparar(self,poblacion_q, solucion, capacidad_max):
         """Evalúa (valor y peso) y repara una solución.
         
         Parámetros
         ----------
-        poblacion_q : [QObjeto]
-            Población de ObjetosCuanticos.
-        solucion : [int]
+        poblacion_q : RegistroCuantico
+            Registro de qubits de la instancia.
+        solucion : np.ndarray
             Solución obtenida de una medición de la población.
         capacidad_max : int
             Capacidad máxima de peso de la mochila.
@@ -165,44 +97,48 @@ class QEA:
         
         Parámetros
         ----------
-        poblacion_q : [QObjeto]
-            Población de ObjetosCuanticos.
+        poblacion_q : RegistroCuantico
+            Población Q(t): registro con amplitudes (tamano_poblacion, n).
         tamano_poblacion : int
             Número de vecindarios de soluciones a generar.
         
         Retorna
         -------
-        [solucion : [int]]
-            Lista de soluciones vecinas.
+        vecindario : np.ndarray[uint8]
+            Matriz (tamano_poblacion, n) con la medición del individuo i en la fila i.
         """
-        vecindario_generado = []
-        for i in range(tamano_poblacion):
-            vecindario_generado.append([q.medir() for q in poblacion_q[i]])
-        return vecindario_generado
+        return poblacion_q.medir(self.rng)
 
     def evaluar_y_reparar_vecindario(self,poblacion_q, vecindario, capacidad_max):
         """Evalúa (valor y peso) y repara todas las soluciones vecinas.
         
         Parámetros
         ----------
-        poblacion_q : [QObjeto]
-            Población de ObjetosCuanticos.
-        vecindario : [[int]]
-            Lista de soluciones vecinas.
+        poblacion_q : RegistroCuantico
+            Población Q(t): registro con amplitudes (tamano_poblacion, n).
+        vecindario : np.ndarray[uint8]
+            Matriz de soluciones vecinas (una por fila).
         capacidad_max : int
             Capacidad máxima de peso de la mochila.
         
         Retorna
         -------
-        [[solucion : [int], valor : int, peso : int]]
+        [[solucion : np.ndarray, valor : int, peso : int]]
             Lista de soluciones reparadas y su evaluación.
         """
-        soluciones = []
-        index = 0
-        for solucion in vecindario:     
-            soluciones.append([solucion, *self.evaluar_y_reparar(poblacion_q[index], solucion, capacidad_max)])
-            index += 1
-        return soluciones
+        perfil = self.perfil_fases
+        t = perfil.marca() if perfil else 0
+        if self.cache is not None:
+            # las soluciones repetidas o ya vistas salen de la caché; el resto se evalúa y repara en un lote
+            valores, pesos = self.cache.evaluar_y_reparar(vecindario, poblacion_q, self.reparador, capacidad_max)
+            if perfil: perfil.fase('cache', t)
+        else:
+            valores, pesos = poblacion_q.evaluar_vecindario(vecindario)
+            if perfil: t = perfil.fase('evaluar', t)
+            # solo las filas que exceden la capacidad pasan a la reparación, todas a la vez
+            self.reparador.reparar_lote(vecindario, np.flatnonzero(pesos > capacidad_max), capacidad_max, valores, pesos)
+            if perfil: perfil.fase('reparar', t)
+        return [[solucion, valor, peso] for solucion, valor, peso in zip(vecindario, valores.tolist(), pesos.tolist())]
 
     def actualizar_estado(self, poblacion_q,tamano_poblacion,angulo, vecindario, b):
         """Actualiza cada qubit de la población aplicando la matriz 
@@ -210,38 +146,33 @@ class QEA:
         
         Parámetros
         ----------
-        poblacion_q : [QObjeto]
-            Población de ObjetosCuanticos.
+        poblacion_q : RegistroCuantico
+            Población Q(t): registro con amplitudes (tamano_poblacion, n).
+        tamano_poblacion : int
+            Número de individuos de la población.
         angulo : float
             Ángulo usado para construir la matriz de rotación.
-        lista_tabu : dict {int : int}
-            Lista tabú (implementada como un diccionario).
-        iteraciones_tabu : int
-            Número de iteraciones que un ítem debe permanecer en la lista tabú.
-        solucion_actual : [int]
-            Solución actual de una medición de la población.
-        b : [int]
+        vecindario : [[solucion : np.ndarray, valor : int, peso : int]]
+            Soluciones medidas de cada individuo, ya evaluadas.
+        b : [solucion : np.ndarray, valor : int, peso : int]
             Solución para comparar con la actual.
         """
-
-        for poblacion in range(tamano_poblacion):
-            diferencia =  vecindario[poblacion][1] - b[1]
-            for i, q in enumerate(poblacion_q[poblacion]):
-                theta = 0
-                #implementación de la lookup table del QEA
-                if not diferencia >= 0:
-                    if vecindario[poblacion][0][i] == 0 and b[0][i]:
-                        theta = angulo
-                    elif vecindario[poblacion][0][i] == 1 and b[0][i] == 0:
-                        theta = -angulo
-                q.actualizar(self.crear_matriz_rotacion(theta))
+        #implementación de la lookup table del QEA: solo rotan los individuos peores
+        #que b y, dentro de ellos, los qubits en los que su solución difiere de b
+        soluciones = np.stack([vecino[0] for vecino in vecindario[:tamano_poblacion]])
+        valores = np.array([vecino[1] for vecino in vecindario[:tamano_poblacion]])
+        diferencias = b[0].astype(np.int8) - soluciones.view(np.int8)
+        mascara = (diferencias != 0) & (valores < b[1])[:, None]
+        if mascara.any():
+            poblacion_q.rotar(angulo * diferencias[mascara], mascara)
             
     def guardar_soluciones(self,vecindario,B,k,tamano_poblacion):
-        combinado = vecindario + B
-        combinado_sorted = sorted(combinado,key=lambda x: x[1], reverse=True)
-        #comprobamos que el numero de iteraciones al menos 1
-        mejores = max(1, int(tamano_poblacion * k / 100))
-        return combinado_sorted[:mejores]
+        """Fusiona el vecindario con B(t), que conserva el k% mejor (ver ArchivoElite)."""
+        soluciones = np.stack([vecino[0] for vecino in vecindario])
+        valores = np.array([vecino[1] for vecino in vecindario], dtype=np.int64)
+        pesos = np.array([vecino[2] for vecino in vecindario], dtype=np.int64)
+        B.fusionar(soluciones, valores, pesos)
+        return B
         
             
 
@@ -251,16 +182,17 @@ class QEA:
         
         Parámetros
         ----------
-        iteraciones : int
-            Número de iteraciones para ejecutar el algoritmo.
+        iteraciones : int o None
+            Número de iteraciones para ejecutar el algoritmo (None: sin límite,
+            la ejecución para por tiempo_limite u otro criterio de parada).
         angulo : float
             Ángulo usado para construir la matriz de rotación.
         tamano_poblacion : int
             Tamaño de la población de vecindarios a generar.
         k : int
             El porcentaje de mejores soluciones que vamos a guardar en B(t) de P(t)
-        archivo: Path
-            Archivo de instancia del problema de la mochila.
+        archivo: Path o Instancia
+            Archivo de instancia del problema de la mochila (o la instancia ya cargada).
         
         Devuelve
         -------
@@ -269,62 +201,146 @@ class QEA:
         mejor_iter : int
             Iteración donde se encontró la mejor solución.
         """
-        poblacion_q = []
         b = []
-        B = []
-        capacidad_max = 0
-        num_items = 0
-        optimo = 0
         solucion_actual = []
         
         mejor_iter = -1
 
         #leemos la entrada del problema
-        with open(archivo) as f:
-            num_items = int(f.readline().split()[1])
-            capacidad_max = int(f.readline().split()[1])
-            optimo = int(f.readline().split()[1])
-            f.readline()
-            for linea in f:
-                _, valor, peso, _ = list(map(int, linea.split(',')))
-                poblacion_q.append(self.QObjeto(valor, peso))
+        instancia = como_instancia(archivo)
+        #un generador propio por ejecución (semilla, SeedSequence o Generator del constructor)
+        self.rng = np.random.default_rng(self.semilla)
+        num_items = len(instancia)
+        capacidad_max = instancia.capacidad
+        optimo = instancia.optimo
+        parada = CriterioParada(self.objetivo, optimo if self.parar_en_optimo else None,
+                                self.max_sin_mejora, self.epsilon_colapso, self.tiempo_limite)
+        self.criterio_parada = 'iteraciones'
+        #perfilado por fases (None si está desactivado)
+        perfil = self.perfil_fases = crear_perfil(self.perfil)
         
         #creamos la poblacion Q(0) con los estados en superposicion de tamanyo tamano_poblacion
-        poblacion_q = [copy.deepcopy(poblacion_q) for _ in range(tamano_poblacion)]
+        poblacion_q = crear_registro(instancia.valores, instancia.pesos, self.representacion, tamano_poblacion)
+        self.reparador = Reparador(poblacion_q.valores, poblacion_q.pesos, self.reparacion, self.rng, perfil)
+        #caché de evaluaciones (None si está desactivada)
+        self.cache = CacheEvaluacion(self.cache_evaluacion) if self.cache_evaluacion else None
+        #comprobamos que el numero de soluciones guardadas sea al menos 1
+        B = ArchivoElite(max(1, int(tamano_poblacion * k / 100)), len(poblacion_q), self.archivo_empaquetado)
 
         vecindario_poblacion = self.obtener_vecindario(poblacion_q , tamano_poblacion)
         vecindario = self.evaluar_y_reparar_vecindario(poblacion_q , vecindario_poblacion, capacidad_max)
         B = self.guardar_soluciones(vecindario, B, k, tamano_poblacion)
-        b = B[0]
+        b = B.mejor()
         #historial de soluciones para hacer la comparativa entre algoritmos
         historial_soluciones = [b[1]]
+        #segundos transcurridos al registrar cada valor del historial
+        historial_tiempos = [parada.transcurrido()]
 
         contador_iter = 0
+        iter_sin_cambio = 0
+
+        #si hay un punto de control de esta ejecución se reanuda desde él
+        if self.punto_control is not None:
+            firma = firma_punto_control('QEA', instancia, theta=angulo, tamano_poblacion=tamano_poblacion, k=k,
+                                        periodo_migracion=periodo_migracion, reparacion=self.reparacion,
+                                        representacion=self.representacion)
+            estado = cargar_punto_control(self.punto_control, firma, self.rng)
+            if estado is not None:
+                poblacion_q.restaurar_estado(estado)
+                B.restaurar_estado({'soluciones': estado['elite_soluciones'], 'valores': estado['elite_valores'],
+                                    'pesos': estado['elite_pesos']})
+                b = B.mejor()
+                contador_iter = int(estado['contador_iter'])
+                iter_sin_cambio = int(estado['iter_sin_cambio'])
+                historial_soluciones = estado['historial'].tolist()
+                historial_tiempos = estado['historial_tiempos'].tolist()
+                parada.reanudar(historial_tiempos[-1])
 
-        while contador_iter < iteraciones:
+        while iteraciones is None or contador_iter < iteraciones:
+            motivo = parada.comprobar(b[1], iter_sin_cambio, poblacion_q)
+            if motivo is not None:
+                self.criterio_parada = motivo
+                break
             contador_iter += 1
+            t = perfil.marca() if perfil else 0
             vecindario_poblacion = self.obtener_vecindario(poblacion_q , tamano_poblacion)
+            if perfil: perfil.fase('medir', t)
             vecindario = self.evaluar_y_reparar_vecindario(poblacion_q , vecindario_poblacion, capacidad_max)
+            if perfil: t = perfil.marca()
             self.actualizar_estado(poblacion_q,tamano_poblacion,angulo,vecindario,b)
+            if perfil: t = perfil.fase('actualizar', t)
             B = self.guardar_soluciones(vecindario, B, k, tamano_poblacion)
             
             #siempre se actualiza, si b era la mejor sol en B(t -1) también lo será en B(t)
-            b = B[0]
+            valor_anterior = b[1]
+            b = B.mejor()
+            iter_sin_cambio = 0 if b[1] > valor_anterior else iter_sin_cambio + 1
             historial_soluciones.append(b[1])
+            historial_tiempos.append(parada.transcurrido())
+            if perfil: t = perfil.fase('seleccionar', t)
             if(contador_iter % periodo_migracion == 0):
                 self.migrar(b,B)
+                if perfil: perfil.fase('migrar', t)
+
+            if self.punto_control is not None and contador_iter % self.periodo_control == 0:
+                elite = B.exportar_estado()
+                guardar_punto_control(self.punto_control, firma, self.rng, contador_iter=contador_iter,
+                                      iter_sin_cambio=iter_sin_cambio,
+                                      historial=np.array(historial_soluciones, dtype=np.int64),
+                                      historial_tiempos=np.array(historial_tiempos),
+                                      elite_soluciones=elite['soluciones'], elite_valores=elite['valores'],
+                                      elite_pesos=elite['pesos'], **poblacion_q.exportar_estado())
             
             
-
+        self.historial_tiempos = historial_tiempos
+        if perfil and self.cache is not None:
+            perfil.contar('aciertos_cache', self.cache.aciertos)
+            perfil.contar('fallos_cache', self.cache.fallos)
+        if perfil: perfil.terminar()
+        #si la ejecución paró antes se repite el último valor para poder promediar historiales
+        if iteraciones is not None:
+            historial_soluciones = rellenar_historial(historial_soluciones, iteraciones + 1)
+        b = [b[0].tolist(), b[1], b[2]]
         return b, mejor_iter, historial_soluciones
     
 
-    def __init__(self,iteraciones,theta,tamano_poblacion,k,periodo_migracion):
+    def __init__(self,iteraciones,theta,tamano_poblacion,k,periodo_migracion,reparacion='eficiencia',representacion='amplitudes',semilla=None,punto_control=None,periodo_control=100,
+                 objetivo=None,parar_en_optimo=False,max_sin_mejora=None,epsilon_colapso=None,
+                 tiempo_limite=None,perfil=None,cache_evaluacion=None,archivo_empaquetado=False):
         self.iteraciones = iteraciones
         self.theta = theta
         self.tamano_poblacion = tamano_poblacion
         self.k = k
         self.periodo_migracion = periodo_migracion
+        self.reparacion = reparacion
+        self.representacion = representacion
+        self.semilla = semilla
+        #archivo .npz donde se guarda el estado cada periodo_control iteraciones para poder
+        #reanudar la ejecución (None lo desactiva)
+        self.punto_control = punto_control
+        self.periodo_control = periodo_control
+        #criterios de parada anticipada (ver parada.CriterioParada); el motivo por el
+        #que termina cada ejecución queda en self.criterio_parada
+        self.objetivo = objetivo
+        self.parar_en_optimo = parar_en_optimo
+        self.max_sin_mejora = max_sin_mejora
+        self.epsilon_colapso = epsilon_colapso
+        #presupuesto de tiempo real en segundos: al agotarlo se devuelve la mejor solución
+        #hasta el momento; con iteraciones=None solo para por tiempo (u otro criterio).
+        #self.historial_tiempos guarda los segundos transcurridos en cada valor del historial
+        if iteraciones is None and tiempo_limite is None:
+            raise ValueError('hace falta un número de iteraciones o un tiempo límite')
+        self.tiempo_limite = tiempo_limite
+        #perfilado por fases (ver perfil.crear_perfil): True, una función que recibe el
+        #resumen al terminar o un perfil.Perfil; el de la última ejecución queda en
+        #self.perfil_fases
+        self.perfil = perfil
+        #caché LRU de soluciones medidas ya evaluadas y reparadas (ver
+        #cache_evaluacion.CacheEvaluacion): número máximo de soluciones guardadas o None
+        #para desactivarla; la de la última ejecución, con su tasa de aciertos, queda en self.cache
+        self.cache_evaluacion = cache_evaluacion
+        #guarda B(t) con 8 objetos por byte (ver ArchivoElite); no cambia los resultados
+        self.archivo_empaquetado = archivo_empaquetado
 
     def run(self,instancia_mochila):
         return self.algoritmo_evolutivo_cuantico(self.iteraciones,self.theta,self.tamano_poblacion,self.k,self.periodo_migracion,instancia_mochila)
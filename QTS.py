@@ -1,60 +1,18 @@
 import numpy as np
-import math
 from pathlib import Path
 import matplotlib as plt
+from reparacion import Reparador
+from registro_cuantico import crear_registro
+from instancia import como_instancia
+from punto_control import guardar_punto_control, cargar_punto_control, firma_punto_control
+from parada import CriterioParada, rellenar_historial
+from perfil import crear_perfil
+from cache_evaluacion import CacheEvaluacion
 
 class QTS:
-    class QObjeto:
-        """Abstracción de la representación de un qubit como un "objeto cuántico" del problema de la mochila.
-        
-        Atributos
-        ----------
-        valor : int
-            Valor del objeto representado por el qubit.
-        peso : int
-            Peso del objeto representado por el qubit.
-        alpha : float, opcional
-            Valor alpha de la representación del qubit (por defecto math.sqrt(1/2)).
-        beta : float, opcional
-            Valor beta de la representación del qubit (por defecto math.sqrt(1/2)).
-        """
-        
-        def __init__(self, valor=None, peso=None, alpha=math.sqrt(1/2), beta=math.sqrt(1/2)):
-            self.alpha = alpha
-            self.beta = beta
-            self.valor = valor
-            self.peso = peso
-        
-        def medir(self):
-            """Mide el valor del qubit comparando con un número aleatorio entre [0,1).
-            
-            Devuelve
-            -------
-            medicion : int
-                0 o 1 dependiendo del qubit (alpha y beta) y el número aleatorio generado.
-            """
-            return 1 if np.random.random_sample() < self.beta**2 else 0
-        
-        def actualizar(self, matriz):
-            """Actualiza los valores alpha y beta del qubit aplicando una matriz.
-            
-            Parámetros
-            ----------
-            matriz :
-                Matriz bidimensional (compuerta cuántica) para aplicar al qubit.
-            """
-            alpha_old = self.alpha
-            beta_old = self.beta
-            self.alpha = matriz[0][0] * alpha_old + matriz[0][1] * beta_old
-            self.beta = matriz[1][0] * alpha_old + matriz[1][1] * beta_old
-
-    def crear_matriz_rotacion(self,angulo):
-        """Genera una matriz de rotación para operar en un QObjeto con el ángulo dado."""
-        return [[math.cos(angulo), -math.sin(angulo)], [math.sin(angulo), math.cos(angulo)]]
-
     def medir_poblacion(self,poblacion_q):
-        """Mide cada qubit de la población de ObjetosCuanticos y devuelve el resultado."""
-        return [q.medir() for q in poblacion_q]
+        """Mide cada qubit del registro cuántico y devuelve el resultado."""
+        return poblacion_q.medir(self.rng)
 
 
     def evaluar_solucion(self,poblacion_q, solucion):
@@ -62,9 +20,9 @@ class QTS:
         
         Parámetros
         ----------
-        poblacion_q : [QObjeto]
-            Población de ObjetosCuanticos.
-        solucion : [int]
+        poblacion_q : RegistroCuantico
+            Registro de qubits de la instancia.
+        solucion : np.ndarray
             Solución obtenida de una medición de la población.
             
         Devuelve
@@ -74,25 +32,19 @@ class QTS:
         peso : int
             Peso total de la solución evaluada.
         """
-        valor_total = 0
-        peso_total = 0
-
-        for i, medida in enumerate(solucion):
-            valor_total += medida*(poblacion_q[i].valor)
-            peso_total += medida*(poblacion_q[i].peso)
-        
-        return valor_total, peso_total
+        return poblacion_q.evaluar(solucion)
 
     def reparar_solucion(self,poblacion_q, solucion, capacidad_max, valor_actual, peso_actual):
         """Repara la solución para hacerla válida.
-        Si la suma de los pesos excede el límite, 
-        elimina objetos al azar hasta satisfacer la restricción.
+        Si la suma de los pesos excede el límite, elimina objetos hasta satisfacer
+        la restricción y rellena con los que quepan, según el modo de reparación
+        del solver ('eficiencia' o 'aleatoria', ver reparacion.Reparador).
         
         Parámetros
         ----------
-        poblacion_q : [QObjeto]
-            Población de ObjetosCuanticos.
-        solucion : [int]
+        poblacion_q : RegistroCuantico
+            Registro de qubits de la instancia.
+        solucion : np.ndarray
             Solución obtenida de una medición de la población.
         capacidad_max : int
             Capacidad máxima de peso de la mochila.
@@ -108,54 +60,16 @@ class QTS:
         peso_actual : int
             Peso total de la solución reparada.
         """
-        while peso_actual > capacidad_max:
-            indice = np.random.randint(0, len(solucion))
-            if solucion[indice]:
-                solucion[indice] = 0
-                valor_actual -= poblacion_q[indice].valor
-                peso_actual -= poblacion_q[indice].peso
-        
-            # Luego intenta rellenar objetos que quepan, de forma codiciosa
-        #capacidad_restante = capacidad_max - peso_actual
-
-        # Buscar candidatos no incluidos que quepan
-        #candidatos = [
-            #(i, q.valor / q.peso if q.peso > 0 else 0)
-            #for i, (q, sel) in enumerate(zip(poblacion_q, solucion))
-            #if sel == 0 and q.peso <= capacidad_restante
-        #]
-
-        # Ordenar por valor/peso descendente
-        #candidatos.sort(key=lambda x: x[1], reverse=True)
-
-        #for i, _ in candidatos:
-            #if poblacion_q[i].peso <= capacidad_restante:
-                #solucion[i] = 1
-                #valor_actual += poblacion_q[i].valor
-                #peso_actual += poblacion_q[i].peso
-                #capacidad_restante -= poblacion_q[i].peso
-        
-        anyadido = True
-        while anyadido:
-            anyadido = False
-            for i in range(len(solucion)):
-                if solucion[i] == 0 and peso_actual + poblacion_q[i].peso <= capacidad_max:
-                    solucion[i] = 1
-                    valor_actual += poblacion_q[i].valor
-                    peso_actual += poblacion_q[i].peso
-                    anyadido = True
-                    break
-
-        return valor_actual, peso_actual
+        return self.reparador.reparar(solucion, capacidad_max, valor_actual, peso_actual)
 
     def evaluar_y_reparar(self,poblacion_q, solucion, capacidad_max):
         """Evalúa (valor y peso) y repara una solución.
         
         Parámetros
         ----------
-        poblacion_q : [QObjeto]
-            Población de ObjetosCuanticos.
-        solucion : [int]
+        poblacion_q : RegistroCuantico
+            Registro de qubits de la instancia.
+        solucion : np.ndarray
             Solución obtenida de una medición de la población.
         capacidad_max : int
             Capacidad máxima de peso de la mochila.
@@ -177,39 +91,48 @@ class QTS:
         
         Parámetros
         ----------
-        poblacion_q : [QObjeto]
-            Población de ObjetosCuanticos.
+        poblacion_q : RegistroCuantico
+            Registro de qubits de la instancia.
         tamano_poblacion : int
             Número de vecindarios de soluciones a generar.
         
         Devuelve
         -------
-        [solucion : [int]]
-            Lista de soluciones vecinas.
+        vecindario : np.ndarray[uint8]
+            Matriz (tamano_poblacion, n) con una solución vecina por fila.
         """
-        return [[q.medir() for q in poblacion_q] for _ in range(tamano_poblacion)]
+        return poblacion_q.medir_vecindario(tamano_poblacion, self.rng)
 
     def evaluar_y_reparar_vecindario(self,poblacion_q, vecindario, capacidad_max):
         """Evalúa (valor y peso) y repara todas las soluciones vecinas.
         
         Parámetros
         ----------
-        poblacion_q : [QObjeto]
-            Población de ObjetosCuanticos.
-        vecindario : [[int]]
-            Lista de soluciones vecinas.
+        poblacion_q : RegistroCuantico
+            Registro de qubits de la instancia.
+        vecindario : np.ndarray[uint8]
+            Matriz de soluciones vecinas (una por fila).
         capacidad_max : int
             Capacidad máxima de peso de la mochila.
         
         Devuelve
         -------
-        [[solucion : [int], valor : int, peso : int]]
+        [[solucion : np.ndarray, valor : int, peso : int]]
             Lista de soluciones reparadas y su evaluación.
         """
-        soluciones = []
-        for solucion in vecindario:       
-            soluciones.append([solucion, *self.evaluar_y_reparar(poblacion_q, solucion, capacidad_max)])
-        return soluciones
+        perfil = self.perfil_fases
+        t = perfil.marca() if perfil else 0
+        if self.cache is not None:
+            # las soluciones repetidas o ya vistas salen de la caché; el resto se evalúa y repara en un lote
+            valores, pesos = self.cache.evaluar_y_reparar(vecindario, poblacion_q, self.reparador, capacidad_max)
+            if perfil: perfil.fase('cache', t)
+        else:
+            valores, pesos = poblacion_q.evaluar_vecindario(vecindario)
+            if perfil: t = perfil.fase('evaluar', t)
+            # solo las filas que exceden la capacidad pasan a la reparación, todas a la vez
+            self.reparador.reparar_lote(vecindario, np.flatnonzero(pesos > capacidad_max), capacidad_max, valores, pesos)
+            if perfil: perfil.fase('reparar', t)
+        return [[solucion, valor, peso] for solucion, valor, peso in zip(vecindario, valores.tolist(), pesos.tolist())]
 
     def actualizar_estado(self,poblacion_q, angulo, sol_actual, solucion_comparacion, es_mejor,lista_tabu,tabu_itt):
         """Actualiza cada qubit de la población aplicando la matriz 
@@ -217,35 +140,30 @@ class QTS:
         
         Parámetros
         ----------
-        poblacion_q : [QObjeto]
-            Población de ObjetosCuanticos.
+        poblacion_q : RegistroCuantico
+            Registro de qubits de la instancia.
         angulo : float
             Ángulo usado para construir la matriz de rotación.
-        lista_tabu : dict {int : int}
-            Lista tabú (implementada como un diccionario).
+        lista_tabu : np.ndarray[int64]
+            Lista tabú implementada como una cuenta atrás por ítem
+            (los ítems con la cuenta a 0 no se rotan).
         tabu_itt : int
             Número de iteraciones que un ítem debe permanecer en la lista tabú.
-        solucion_actual : [int]
+        solucion_actual : np.ndarray
             Solución actual de una medición de la población.
-        solucion_comparacion : [int]
+        solucion_comparacion : np.ndarray
             Solución para comparar con la actual.
         es_mejor : bool
             True si la solución de comparación fue la mejor encontrada.
         """
-        for i, q in enumerate(poblacion_q):
-            
-            if lista_tabu.setdefault(i, 0) == 0:
-                continue
-            diferencia = solucion_comparacion[i] - sol_actual[i]
-            if diferencia == 0:
-                lista_tabu[i] = tabu_itt
-                continue
-            if not es_mejor: 
-                diferencia *= -1
-            if q.alpha * q.beta < 0:
-                diferencia *= -1
-            
-            q.actualizar(self.crear_matriz_rotacion(angulo*diferencia))
+        activos = lista_tabu != 0
+        diferencias = (solucion_comparacion.astype(np.int64) - sol_actual) * activos
+        lista_tabu[activos & (diferencias == 0)] = tabu_itt
+        if not es_mejor: 
+            diferencias *= -1
+        
+        diferencias[poblacion_q.signos_opuestos()] *= -1
+        poblacion_q.rotar(angulo*diferencias)
             
             
 
@@ -255,16 +173,17 @@ class QTS:
         
         Parámetros
         ----------
-        iteraciones : int
-            Número de iteraciones para ejecutar el algoritmo.
+        iteraciones : int o None
+            Número de iteraciones para ejecutar el algoritmo (None: sin límite,
+            la ejecución para por tiempo_limite u otro criterio de parada).
         angulo : float
             Ángulo usado para construir la matriz de rotación.
         tamano_poblacion : int
             Tamaño de la población de vecindarios a generar.
         iteraciones_tabu : int
             Número de iteraciones que un ítem debe permanecer en la lista tabú.
-        archivo: Path
-            Archivo de instancia del problema de la mochila.
+        archivo: Path o Instancia
+            Archivo de instancia del problema de la mochila (o la instancia ya cargada).
         
         Devuelve
         -------
@@ -274,24 +193,29 @@ class QTS:
             Iteración donde se encontró la mejor solución.
         """
         
-        poblacion_q = []
-        lista_tabu = dict()
-        capacidad_max = 0
-        num_items = 0
-        optimo = 0
         solucion_actual = None
         
         mejor_sol = []
         mejor_iter = -1
 
-        with open(archivo) as f:
-            num_items = int(f.readline().split()[1])
-            capacidad_max = int(f.readline().split()[1])
-            optimo = int(f.readline().split()[1])
-            f.readline()
-            for linea in f:
-                _, valor, peso, _ = list(map(int, linea.split(',')))
-                poblacion_q.append(self.QObjeto(valor, peso))
+        instancia = como_instancia(archivo)
+        #un generador propio por ejecución (semilla, SeedSequence o Generator del constructor)
+        self.rng = np.random.default_rng(self.semilla)
+        num_items = len(instancia)
+        capacidad_max = instancia.capacidad
+        optimo = instancia.optimo
+        parada = CriterioParada(self.objetivo, optimo if self.parar_en_optimo else None,
+                                self.max_sin_mejora, self.epsilon_colapso, self.tiempo_limite)
+        self.criterio_parada = 'iteraciones'
+        #perfilado por fases (None si está desactivado)
+        perfil = self.perfil_fases = crear_perfil(self.perfil)
+        poblacion_q = crear_registro(instancia.valores, instancia.pesos, self.representacion)
+        #la cuenta empieza en 1: el primer decremento la deja a 0 y en la primera
+        #iteración ningún ítem se rota, como con la lista tabú vacía original
+        lista_tabu = np.ones(len(poblacion_q), dtype=np.int64)
+        self.reparador = Reparador(poblacion_q.valores, poblacion_q.pesos, self.reparacion, self.rng, perfil)
+        #caché de evaluaciones (None si está desactivada)
+        self.cache = CacheEvaluacion(self.cache_evaluacion) if self.cache_evaluacion else None
         
         solucion_actual = self.medir_poblacion(poblacion_q)
         valor_actual, peso_actual = self.evaluar_y_reparar(poblacion_q, solucion_actual, capacidad_max)
@@ -299,12 +223,38 @@ class QTS:
         mejor_sol = [solucion_actual, valor_actual, peso_actual]
         #historial de soluciones para hacer la comparativa entre algoritmos
         historial_soluciones = [mejor_sol[1]]
+        #segundos transcurridos al registrar cada valor del historial
+        historial_tiempos = [parada.transcurrido()]
         contador_iter = 0
         iter_sin_cambio = 0
-        while contador_iter < iteraciones:
+
+        #si hay un punto de control de esta ejecución se reanuda desde él
+        if self.punto_control is not None:
+            firma = firma_punto_control('QTS', instancia, theta=angulo, tamano_poblacion=tamano_poblacion,
+                                        itt_tabu=itt_tabu, reparacion=self.reparacion, representacion=self.representacion)
+            estado = cargar_punto_control(self.punto_control, firma, self.rng)
+            if estado is not None:
+                poblacion_q.restaurar_estado(estado)
+                lista_tabu = estado['lista_tabu'].astype(np.int64)
+                solucion_actual = estado['solucion_actual']
+                mejor_sol = [estado['mejor_solucion'], int(estado['mejor_valor']), int(estado['mejor_peso'])]
+                mejor_iter = int(estado['mejor_iter'])
+                contador_iter = int(estado['contador_iter'])
+                iter_sin_cambio = int(estado['iter_sin_cambio'])
+                historial_soluciones = estado['historial'].tolist()
+                historial_tiempos = estado['historial_tiempos'].tolist()
+                parada.reanudar(historial_tiempos[-1])
+        while iteraciones is None or contador_iter < iteraciones:
+            motivo = parada.comprobar(mejor_sol[1], iter_sin_cambio, poblacion_q)
+            if motivo is not None:
+                self.criterio_parada = motivo
+                break
             contador_iter += 1
+            t = perfil.marca() if perfil else 0
             vecindario_poblacion = self.obtener_vecindario(poblacion_q, tamano_poblacion)
+            if perfil: perfil.fase('medir', t)
             vecindario = self.evaluar_y_reparar_vecindario(poblacion_q, vecindario_poblacion, capacidad_max)
+            if perfil: t = perfil.marca()
             mejor_vecino = max(vecindario, key=lambda x: x[1])
             peor_vecino = min(vecindario, key=lambda x: x[1])
             
@@ -320,27 +270,76 @@ class QTS:
             else: 
                 iter_sin_cambio +=1
 
-            for key, value in list(lista_tabu.items()):
-                lista_tabu[key] -= 1
-                if lista_tabu[key]==0:
-                    del lista_tabu[key]
+            lista_tabu -= 1
             
             historial_soluciones.append(mejor_sol[1])
+            historial_tiempos.append(parada.transcurrido())
+            if perfil: t = perfil.fase('seleccionar', t)
             self.actualizar_estado(poblacion_q, angulo, solucion_actual, mejor_sol[0], True,lista_tabu,self.itt_tabu)
+            if perfil: t = perfil.fase('actualizar', t)
             solucion_actual = self.medir_poblacion(poblacion_q)
+            if perfil: t = perfil.fase('medir', t)
             
             self.actualizar_estado(poblacion_q, angulo/3, solucion_actual, peor_vecino[0], False,lista_tabu,self.itt_tabu)
+            if perfil: t = perfil.fase('actualizar', t)
             solucion_actual = self.medir_poblacion(poblacion_q)
-            
+            if perfil: perfil.fase('medir', t)
+
+            if self.punto_control is not None and contador_iter % self.periodo_control == 0:
+                guardar_punto_control(self.punto_control, firma, self.rng, lista_tabu=lista_tabu,
+                                      solucion_actual=solucion_actual, mejor_solucion=mejor_sol[0],
+                                      mejor_valor=mejor_sol[1], mejor_peso=mejor_sol[2], mejor_iter=mejor_iter,
+                                      contador_iter=contador_iter, iter_sin_cambio=iter_sin_cambio,
+                                      historial=np.array(historial_soluciones, dtype=np.int64),
+                                      historial_tiempos=np.array(historial_tiempos),
+                                      **poblacion_q.exportar_estado())
 
+        self.historial_tiempos = historial_tiempos
+        if perfil and self.cache is not None:
+            perfil.contar('aciertos_cache', self.cache.aciertos)
+            perfil.contar('fallos_cache', self.cache.fallos)
+        if perfil: perfil.terminar()
+        #si la ejecución paró antes se repite el último valor para poder promediar historiales
+        if iteraciones is not None:
+            historial_soluciones = rellenar_historial(historial_soluciones, iteraciones + 1)
+        mejor_sol = [mejor_sol[0].tolist(), mejor_sol[1], mejor_sol[2]]
         return mejor_sol, mejor_iter, historial_soluciones
     
 
-    def __init__(self,iteraciones,theta,tamano_poblacion,itt_tabu):
+    def __init__(self,iteraciones,theta,tamano_poblacion,itt_tabu,reparacion='eficiencia',representacion='amplitudes',semilla=None,punto_control=None,periodo_control=100,
+                 objetivo=None,parar_en_optimo=False,max_sin_mejora=None,epsilon_colapso=None,
+                 tiempo_limite=None,perfil=None,cache_evaluacion=None):
         self.iteraciones = iteraciones
         self.theta = theta
         self.tamano_poblacion = tamano_poblacion
         self.itt_tabu = itt_tabu
+        self.reparacion = reparacion
+        self.representacion = representacion
+        self.semilla = semilla
+        #archivo .npz donde se guarda el estado cada periodo_control iteraciones para poder
+        #reanudar la ejecución (None lo desactiva)
+        self.punto_control = punto_control
+        self.periodo_control = periodo_control
+        #criterios de parada anticipada (ver parada.CriterioParada); el motivo por el
+        #que termina cada ejecución queda en self.criterio_parada
+        self.objetivo = objetivo
+        self.parar_en_optimo = parar_en_optimo
+        self.max_sin_mejora = max_sin_mejora
+        self.epsilon_colapso = epsilon_colapso
+        #presupuesto de tiempo real en segundos: al agotarlo se devuelve la mejor solución
+        #hasta el momento; con iteraciones=None solo para por tiempo (u otro criterio).
+        #self.historial_tiempos guarda los segundos transcurridos en cada valor del historial
+        if iteraciones is None and tiempo_limite is None:
+            raise ValueError('hace falta un número de iteraciones o un tiempo límite')
+        self.tiempo_limite = tiempo_limite
+        #perfilado por fases (ver perfil.crear_perfil): True, una función que recibe el
+        #resumen al terminar o un perfil.Perfil; el de la última ejecución queda en
+        #self.perfil_fases
+        self.perfil = perfil
+        #caché LRU de soluciones medidas ya evaluadas y reparadas (ver
+        #cache_evaluacion.CacheEvaluacion): número máximo de soluciones guardadas o None
+        #para desactivarla; la de la última ejecución, con su tasa de aciertos, queda en self.cache
+        self.cache_evaluacion = cache_evaluacion
 
 
     def run(self,instancia_mochila):
@@ -0,0 +1,84 @@
+import os
+import json
+import hashlib
+import zipfile
+import numpy as np
+from pathlib import Path
+
+
+class AlmacenResultados:
+    """Almacén en disco de los resultados de un barrido, un registro por tarea.
+
+    Cada ejecución terminada se guarda como un .npz comprimido cuyo nombre
+    deriva de (algoritmo, parámetros, instancia, semilla), de modo que al
+    relanzar un barrido interrumpido se saltan las tareas ya hechas. Los
+    registros se escriben en un temporal y se renombran, así que nunca quedan
+    a medias.
+
+    Atributos
+    ----------
+    directorio : Path
+        Directorio de los registros (se crea si no existe).
+    instancia : str
+        Identificación de la instancia (nombre, n y capacidad).
+    periodo_control : int o None
+        Si se indica, cada tarea guarda además un punto de control del solver
+        cada periodo_control iteraciones para reanudar ejecuciones largas.
+    """
+
+    def __init__(self, directorio, instancia, periodo_control=None):
+        self.directorio = Path(directorio)
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        self.instancia = f'{instancia.nombre}-{len(instancia)}-{instancia.capacidad}'
+        self.periodo_control = periodo_control
+
+    def semilla_barrido(self, semilla=None):
+        """Devuelve la semilla del barrido, guardándola para poder reanudarlo.
+
+        Sin semilla explícita se reutiliza la del barrido guardado en el
+        directorio o, si no hay ninguno, se genera una nueva y se guarda.
+        """
+        if semilla is not None:
+            return semilla
+        ruta = self.directorio / 'semilla.json'
+        if ruta.exists():
+            return json.loads(ruta.read_text())
+        semilla = np.random.SeedSequence().entropy
+        ruta.write_text(json.dumps(semilla))
+        return semilla
+
+    def clave(self, tarea):
+        """Identificador estable de una tarea."""
+        descripcion = json.dumps({'instancia': self.instancia, 'algoritmo': tarea.algoritmo,
+                                  'parametros': tarea.parametros, 'entropia': tarea.semilla.entropy,
+                                  'spawn_key': list(tarea.semilla.spawn_key)}, sort_keys=True)
+        return f'{tarea.algoritmo}-{hashlib.sha1(descripcion.encode()).hexdigest()[:20]}'
+
+    def ruta(self, tarea):
+        """Archivo del registro de una tarea."""
+        return self.directorio / f'{self.clave(tarea)}.npz'
+
+    def ruta_punto_control(self, tarea):
+        """Archivo del punto de control del solver de una tarea (None si están desactivados)."""
+        if self.periodo_control is None:
+            return None
+        return self.directorio / f'{self.clave(tarea)}.control.npz'
+
+    def guardar(self, tarea, historial):
+        """Guarda el historial de una tarea terminada y borra su punto de control."""
+        destino = self.ruta(tarea)
+        temporal = destino.with_name(f'{destino.stem}.{os.getpid()}.tmp.npz')
+        np.savez_compressed(temporal, historial=np.asarray(historial, dtype=np.int64),
+                            etiqueta=np.array(tarea.etiqueta), ejecucion=tarea.ejecucion)
+        os.replace(temporal, destino)
+        punto_control = self.ruta_punto_control(tarea)
+        if punto_control is not None and punto_control.exists():
+            punto_control.unlink()
+
+    def cargar(self, tarea):
+        """Devuelve el historial guardado de una tarea o None si no está (o está dañado)."""
+        try:
+            with np.load(self.ruta(tarea)) as datos:
+                return datos['historial']
+        except (OSError, KeyError, ValueError, EOFError, zipfile.BadZipFile):
+            return None
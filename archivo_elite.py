@@ -0,0 +1,119 @@
+import numpy as np
+from empaquetado import empaquetar, desempaquetar
+
+
+class ArchivoElite:
+    """Archivo acotado con las mejores soluciones encontradas (B(t) del QEA).
+
+    Las soluciones se guardan como filas de una matriz preasignada, ordenadas
+    de mayor a menor valor, de modo que la fila 0 es siempre la mejor. Con
+    empaquetado=True las filas se guardan con 8 objetos por byte (ver
+    empaquetado.empaquetar), 8 veces menos memoria para archivos grandes; solo
+    se desempaqueta la solución que devuelve mejor().
+
+    Atributos
+    ----------
+    capacidad : int
+        Número máximo de soluciones guardadas.
+    soluciones : np.ndarray[uint8]
+        Matriz (capacidad, n) de soluciones, o (capacidad, ceil(n/8)) si están
+        empaquetadas; solo las primeras tamano filas son válidas.
+    valores : np.ndarray[int64]
+        Valor de cada solución guardada.
+    pesos : np.ndarray[int64]
+        Peso de cada solución guardada.
+    tamano : int
+        Número de soluciones guardadas.
+    num_items : int
+        Número de objetos de cada solución.
+    empaquetado : bool
+        Si las soluciones se guardan empaquetadas.
+    """
+
+    def __init__(self, capacidad, num_items, empaquetado=False):
+        self.capacidad = capacidad
+        self.num_items = num_items
+        self.empaquetado = empaquetado
+        ancho = -(-num_items // 8) if empaquetado else num_items
+        self.soluciones = np.zeros((capacidad, ancho), dtype=np.uint8)
+        self.valores = np.zeros(capacidad, dtype=np.int64)
+        self.pesos = np.zeros(capacidad, dtype=np.int64)
+        self.tamano = 0
+
+    def __len__(self):
+        return self.tamano
+
+    def fusionar(self, soluciones, valores, pesos):
+        """Combina una generación nueva con el archivo y conserva las mejores.
+
+        La selección usa np.partition sobre los P + capacidad valores en lugar de
+        ordenar todo: solo se ordenan las soluciones elegidas. A igual valor se
+        prefieren las soluciones nuevas y, entre ellas, las de índice menor,
+        igual que al ordenar de forma estable vecindario + B.
+
+        Parámetros
+        ----------
+        soluciones : np.ndarray
+            Matriz (P, n) con las soluciones de la generación.
+        valores : np.ndarray[int64]
+            Valor de cada solución de la generación.
+        pesos : np.ndarray[int64]
+            Peso de cada solución de la generación.
+        """
+        num_nuevas = len(valores)
+        if self.empaquetado:
+            soluciones = empaquetar(soluciones)
+        candidatos = np.concatenate((valores, self.valores[:self.tamano]))
+        elegidas = min(self.capacidad, len(candidatos))
+        if elegidas < len(candidatos):
+            umbral = np.partition(candidatos, len(candidatos) - elegidas)[len(candidatos) - elegidas]
+            mayores = np.flatnonzero(candidatos > umbral)
+            iguales = np.flatnonzero(candidatos == umbral)[:elegidas - len(mayores)]
+            indices = np.concatenate((mayores, iguales))
+        else:
+            indices = np.arange(len(candidatos))
+        indices = indices[np.argsort(-candidatos[indices], kind='stable')]
+
+        nuevas = indices < num_nuevas
+        filas = np.empty((elegidas, self.soluciones.shape[1]), dtype=np.uint8)
+        filas[nuevas] = soluciones[indices[nuevas]]
+        filas[~nuevas] = self.soluciones[indices[~nuevas] - num_nuevas]
+        pesos_candidatos = np.concatenate((pesos, self.pesos[:self.tamano]))
+
+        self.soluciones[:elegidas] = filas
+        self.valores[:elegidas] = candidatos[indices]
+        self.pesos[:elegidas] = pesos_candidatos[indices]
+        self.tamano = elegidas
+
+    def mejor(self):
+        """Devuelve la mejor solución guardada como [solucion, valor, peso]."""
+        solucion = desempaquetar(self.soluciones[0], self.num_items) if self.empaquetado else self.soluciones[0].copy()
+        return [solucion, int(self.valores[0]), int(self.pesos[0])]
+
+    def migrar(self):
+        """Sustituye todas las soluciones guardadas por la mejor (migración global)."""
+        self.soluciones[1:self.tamano] = self.soluciones[0]
+        self.valores[1:self.tamano] = self.valores[0]
+        self.pesos[1:self.tamano] = self.pesos[0]
+
+    def exportar_estado(self):
+        """Devuelve un diccionario con copias de las soluciones guardadas (para puntos de control).
+
+        Las soluciones se exportan siempre desempaquetadas, así que un punto de
+        control sirve para reanudar con o sin empaquetado.
+        """
+        soluciones = self.soluciones[:self.tamano]
+        return {'soluciones': desempaquetar(soluciones, self.num_items) if self.empaquetado else soluciones.copy(),
+                'valores': self.valores[:self.tamano].copy(),
+                'pesos': self.pesos[:self.tamano].copy()}
+
+    def restaurar_estado(self, estado):
+        """Restaura las soluciones guardadas con exportar_estado."""
+        tamano = len(estado['valores'])
+        if tamano > self.capacidad or np.shape(estado['soluciones'])[1:] != (self.num_items,):
+            raise ValueError('el estado guardado no corresponde a este archivo de élite')
+        soluciones = np.asarray(estado['soluciones'], dtype=np.uint8)
+        self.soluciones[:tamano] = empaquetar(soluciones) if self.empaquetado else soluciones
+        self.valores[:tamano] = estado['valores']
+        self.pesos[:tamano] = estado['pesos']
+        self.tamano = tamano
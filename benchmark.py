@@ -0,0 +1,224 @@
+import sys
+import json
+import math
+import time
+import platform
+import argparse
+import multiprocessing
+import numpy as np
+from pathlib import Path
+from instancia import cargar_instancia
+from planificador import ALGORITMOS
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# Parámetros de cada solver en el benchmark (sin iteraciones ni semilla)
+CONFIGURACIONES = {
+    'QTS': dict(theta=0.01 * math.pi, tamano_poblacion=10, itt_tabu=2),
+    'AE_QTS': dict(theta=0.1 * math.pi, tamano_poblacion=10, iteraciones_tabu=2),
+    'QEA': dict(theta=0.01 * math.pi, tamano_poblacion=10, k=50, periodo_migracion=10),
+    'GA': dict(population_size=10, mutation_rate=0.01),
+}
+
+# Métricas que se comparan con la línea base: True si un valor mayor es mejor
+METRICAS_COMPARADAS = {
+    'iter_por_segundo': True,
+    'segundos': False,
+    'rss_pico_mb': False,
+}
+
+
+def rss_pico_mb():
+    """Pico de memoria residente del proceso actual en MB (None si no se puede medir)."""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    return pico / 2**20 if sys.platform == 'darwin' else pico / 2**10
+
+
+def primer_tiempo(historial, tiempos, condicion):
+    """Segundos hasta el primer valor del historial que cumple condicion (None si ninguno)."""
+    for valor, tiempo in zip(historial, tiempos):
+        if condicion(valor):
+            return tiempo
+    return None
+
+
+def medir(algoritmo, archivo, iteraciones, tiempo_limite, semilla, porcentajes, cache_evaluacion=None):
+    """Ejecuta un solver una vez sobre una instancia y mide su rendimiento.
+
+    Se llama en un proceso nuevo por medición, de modo que el pico de memoria
+    corresponde solo a esa ejecución.
+
+    Devuelve
+    -------
+    medicion : dict
+        segundos, iteraciones, iter_por_segundo, rss_pico_mb, mejor_valor,
+        tiempo_primera_factible, tiempo_objetivo (segundos hasta alcanzar cada
+        porcentaje del óptimo z, None si no se alcanza o z no se conoce) y
+        tasa_aciertos_cache (None sin caché de evaluaciones o en el GA).
+    """
+    instancia = cargar_instancia(archivo)
+    parametros = dict(CONFIGURACIONES[algoritmo])
+    tasa_aciertos_cache = None
+    inicio = time.perf_counter()
+    if algoritmo == 'GA':
+        solucion, historial = ALGORITMOS['GA'](instancia, generations=iteraciones, time_budget=tiempo_limite,
+                                               seed=semilla, **parametros)
+        tiempos = solucion['times']
+        # el primer valor del historial es la población inicial
+        realizadas = len(tiempos) - 1
+        mejor_valor = solucion['value']
+    else:
+        solver = ALGORITMOS[algoritmo](iteraciones, semilla=semilla, tiempo_limite=tiempo_limite,
+                                       cache_evaluacion=cache_evaluacion, **parametros)
+        mejor, _, historial = solver.run(instancia)
+        if solver.cache is not None:
+            tasa_aciertos_cache = solver.cache.tasa_aciertos
+        tiempos = solver.historial_tiempos
+        # el primer valor del historial es la solución inicial
+        realizadas = len(tiempos) - 1
+        mejor_valor = mejor[1]
+    segundos = time.perf_counter() - inicio
+
+    tiempo_objetivo = {}
+    for porcentaje in porcentajes:
+        objetivo = instancia.optimo * porcentaje / 100
+        if instancia.optimo > 0:
+            tiempo_objetivo[str(porcentaje)] = primer_tiempo(historial, tiempos, lambda valor: valor >= objetivo)
+        else:
+            tiempo_objetivo[str(porcentaje)] = None
+    return {
+        'segundos': segundos,
+        'iteraciones': realizadas,
+        'iter_por_segundo': realizadas / segundos if segundos > 0 else None,
+        'rss_pico_mb': rss_pico_mb(),
+        'mejor_valor': int(mejor_valor),
+        # las soluciones reparadas siempre son factibles; en el GA una fitness 0 es no factible
+        'tiempo_primera_factible': primer_tiempo(historial, tiempos, lambda valor: valor > 0),
+        'tiempo_objetivo': tiempo_objetivo,
+        'tasa_aciertos_cache': tasa_aciertos_cache,
+    }
+
+
+def mediana(valores):
+    valores = [valor for valor in valores if valor is not None]
+    return float(np.median(valores)) if valores else None
+
+
+def resumir(mediciones):
+    """Combina las repeticiones de un caso: mediana de cada métrica y, para los
+    objetivos, la mediana de las repeticiones que lo alcanzan y la tasa de éxito."""
+    resumen = {metrica: mediana([m[metrica] for m in mediciones])
+               for metrica in ('segundos', 'iteraciones', 'iter_por_segundo', 'rss_pico_mb',
+                               'mejor_valor', 'tiempo_primera_factible', 'tasa_aciertos_cache')}
+    resumen['tiempo_objetivo'] = {}
+    resumen['tasa_objetivo'] = {}
+    for porcentaje in mediciones[0]['tiempo_objetivo']:
+        tiempos = [m['tiempo_objetivo'][porcentaje] for m in mediciones]
+        resumen['tiempo_objetivo'][porcentaje] = mediana(tiempos)
+        resumen['tasa_objetivo'][porcentaje] = sum(t is not None for t in tiempos) / len(tiempos)
+    return resumen
+
+
+def instancias_de(directorio):
+    """CSV de las instancias del directorio, de menor a mayor número de objetos."""
+    archivos = sorted(Path(directorio).glob('*.csv'))
+    return sorted(archivos, key=lambda archivo: (len(cargar_instancia(archivo)), archivo.name))
+
+
+def ejecutar_benchmark(archivos, algoritmos, iteraciones, tiempo_limite, repeticiones, porcentajes, semilla=0,
+                       cache_evaluacion=None):
+    """Mide cada algoritmo sobre cada instancia (repeticiones veces, cada una en un proceso nuevo).
+
+    Devuelve
+    -------
+    informe : dict
+        Entorno, parámetros y una lista de casos (instancia, algoritmo, métricas).
+    """
+    contexto = multiprocessing.get_context('spawn')
+    casos = []
+    for archivo in archivos:
+        instancia = cargar_instancia(archivo)
+        for algoritmo in algoritmos:
+            mediciones = []
+            for repeticion in range(repeticiones):
+                with contexto.Pool(1) as pool:
+                    mediciones.append(pool.apply(medir, (algoritmo, str(archivo), iteraciones, tiempo_limite,
+                                                         [semilla, repeticion], porcentajes, cache_evaluacion)))
+            caso = {'instancia': instancia.nombre, 'num_items': len(instancia), 'algoritmo': algoritmo,
+                    **resumir(mediciones)}
+            casos.append(caso)
+            print(f"{caso['instancia']:>28} {algoritmo:>7}  {caso['iter_por_segundo'] or 0:10.1f} it/s  "
+                  f"{caso['rss_pico_mb'] or 0:8.1f} MB  mejor {caso['mejor_valor']}", flush=True)
+    return {
+        'entorno': {'python': platform.python_version(), 'numpy': np.__version__,
+                    'plataforma': platform.platform(), 'procesador': platform.processor(),
+                    'nucleos': multiprocessing.cpu_count()},
+        'parametros': {'iteraciones': iteraciones, 'tiempo_limite': tiempo_limite, 'repeticiones': repeticiones,
+                       'porcentajes': porcentajes, 'semilla': semilla, 'cache_evaluacion': cache_evaluacion,
+                       'configuraciones': CONFIGURACIONES},
+        'casos': casos,
+    }
+
+
+def comparar(informe, base, tolerancia):
+    """Compara un informe con otro anterior (línea base) caso a caso.
+
+    Devuelve
+    -------
+    regresiones : [str]
+        Descripción de las métricas que empeoran más de tolerancia (fracción).
+    """
+    anteriores = {(caso['instancia'], caso['algoritmo']): caso for caso in base['casos']}
+    regresiones = []
+    for caso in informe['casos']:
+        anterior = anteriores.get((caso['instancia'], caso['algoritmo']))
+        if anterior is None:
+            continue
+        for metrica, mayor_es_mejor in METRICAS_COMPARADAS.items():
+            actual, previo = caso.get(metrica), anterior.get(metrica)
+            if not actual or not previo:
+                continue
+            cambio = actual / previo - 1
+            empeora = -cambio if mayor_es_mejor else cambio
+            marca = 'REGRESIÓN' if empeora > tolerancia else ('mejora' if -empeora > tolerancia else '')
+            print(f"{caso['instancia']:>28} {caso['algoritmo']:>7} {metrica:>17}: "
+                  f"{previo:12.3f} -> {actual:12.3f} ({cambio:+7.1%}) {marca}")
+            if empeora > tolerancia:
+                regresiones.append(f"{caso['instancia']} {caso['algoritmo']} {metrica} {cambio:+.1%}")
+    return regresiones
+
+
+if __name__ == '__main__':
+    # Uso: python benchmark.py [--salida benchmark.json] [--base anterior.json] [--iteraciones 100] ...
+    parser = argparse.ArgumentParser(description='Benchmark de los solvers sobre las instancias de data/.')
+    parser.add_argument('--datos', default='data', help='directorio con las instancias CSV')
+    parser.add_argument('--algoritmos', nargs='+', default=list(CONFIGURACIONES), choices=list(CONFIGURACIONES))
+    parser.add_argument('--iteraciones', type=int, default=100, help='iteraciones (generaciones en el GA) por ejecución')
+    parser.add_argument('--tiempo-limite', type=float, default=None, help='presupuesto de segundos por ejecución')
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--porcentajes', type=float, nargs='+', default=[95, 99, 100],
+                        help='porcentajes del óptimo z para el tiempo hasta objetivo')
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--cache-evaluacion', type=int, default=None,
+                        help='tamaño de la caché de evaluaciones de los solvers cuánticos (sin caché por defecto)')
+    parser.add_argument('--salida', default='benchmark.json', help='archivo JSON de resultados')
+    parser.add_argument('--base', default=None, help='JSON de una ejecución anterior con el que comparar')
+    parser.add_argument('--tolerancia', type=float, default=0.1, help='empeoramiento relativo que se considera regresión')
+    argumentos = parser.parse_args()
+
+    informe = ejecutar_benchmark(instancias_de(argumentos.datos), argumentos.algoritmos, argumentos.iteraciones,
+                                 argumentos.tiempo_limite, argumentos.repeticiones, argumentos.porcentajes,
+                                 argumentos.semilla, argumentos.cache_evaluacion)
+    Path(argumentos.salida).write_text(json.dumps(informe, indent=2, ensure_ascii=False))
+    if argumentos.base is not None:
+        regresiones = comparar(informe, json.loads(Path(argumentos.base).read_text()), argumentos.tolerancia)
+        if regresiones:
+            print(f'{len(regresiones)} regresiones respecto a {argumentos.base}')
+            sys.exit(1)
@@ -0,0 +1,113 @@
+import numpy as np
+from collections import OrderedDict
+from empaquetado import empaquetar, desempaquetar, clave
+
+
+class CacheEvaluacion:
+    """Caché LRU acotada de soluciones medidas ya evaluadas y reparadas.
+
+    Cuando las amplitudes convergen, muchas mediciones de un vecindario son la
+    misma cadena de bits. La caché guarda, por cada solución medida, la solución
+    reparada y su valor y peso, de modo que las repetidas (dentro del vecindario
+    o de iteraciones anteriores) no se vuelven a evaluar ni reparar.
+
+    La clave son los bytes de la solución empaquetada (ver empaquetado.empaquetar,
+    n/8 bytes), así que no hay colisiones. Con la reparación 'eficiencia' el
+    resultado es idéntico al de no usar caché; con la 'aleatoria' todas las
+    mediciones iguales reciben la misma reparación.
+
+    Atributos
+    ----------
+    capacidad : int
+        Número máximo de soluciones guardadas; al superarlo se descarta la usada
+        hace más tiempo.
+    aciertos : int
+        Soluciones resueltas sin evaluar ni reparar (repetidas en el vecindario
+        o encontradas en la caché).
+    fallos : int
+        Soluciones evaluadas (y reparadas si hacía falta).
+    """
+
+    def __init__(self, capacidad):
+        if capacidad < 1:
+            raise ValueError(f'la capacidad de la caché debe ser positiva: {capacidad}')
+        self.capacidad = capacidad
+        self.aciertos = 0
+        self.fallos = 0
+        self._entradas = OrderedDict()
+
+    def __len__(self):
+        return len(self._entradas)
+
+    @property
+    def tasa_aciertos(self):
+        """Fracción de soluciones resueltas por la caché (0 si no se ha consultado)."""
+        consultas = self.aciertos + self.fallos
+        return self.aciertos / consultas if consultas else 0.0
+
+    def evaluar_y_reparar(self, vecindario, registro, reparador, capacidad_max):
+        """Evalúa y repara (en el sitio) un vecindario consultando la caché.
+
+        Solo las soluciones distintas que no están en la caché pasan por
+        registro.evaluar_vecindario y reparador.reparar_lote, en un único lote.
+
+        Parámetros
+        ----------
+        vecindario : np.ndarray[uint8]
+            Matriz (P, n) de soluciones medidas, una por fila; se sustituye por las reparadas.
+        registro : RegistroCuantico
+            Registro de qubits con la tabla de objetos de la instancia.
+        reparador : Reparador
+            Motor de reparación del solver.
+        capacidad_max : int
+            Capacidad máxima de peso de la mochila.
+
+        Devuelve
+        -------
+        valores : np.ndarray[int64]
+            Valor total de cada solución reparada.
+        pesos : np.ndarray[int64]
+            Peso total de cada solución reparada.
+        """
+        num_items = vecindario.shape[1]
+        claves = [clave(fila) for fila in empaquetar(vecindario)]
+        valores = np.empty(len(claves), dtype=np.int64)
+        pesos = np.empty(len(claves), dtype=np.int64)
+        # filas de cada solución distinta que no está en la caché
+        pendientes = {}
+        for i, clave_fila in enumerate(claves):
+            if clave_fila in pendientes:
+                pendientes[clave_fila].append(i)
+                self.aciertos += 1
+                continue
+            entrada = self._entradas.get(clave_fila)
+            if entrada is None:
+                pendientes[clave_fila] = [i]
+                self.fallos += 1
+                continue
+            self._entradas.move_to_end(clave_fila)
+            self.aciertos += 1
+            reparada, valores[i], pesos[i] = entrada
+            if reparada != clave_fila:
+                vecindario[i] = desempaquetar(np.frombuffer(reparada, dtype=np.uint8), num_items)
+
+        if not pendientes:
+            return valores, pesos
+        # sin aciertos (lo habitual al principio) se evalúa el vecindario en el sitio, sin copiar filas
+        todas = len(pendientes) == len(claves)
+        nuevas = vecindario if todas else vecindario[[indices[0] for indices in pendientes.values()]]
+        valores_nuevas, pesos_nuevas = registro.evaluar_vecindario(nuevas)
+        reparador.reparar_lote(nuevas, np.flatnonzero(pesos_nuevas > capacidad_max), capacidad_max,
+                               valores_nuevas, pesos_nuevas)
+        if todas:
+            valores, pesos = valores_nuevas, pesos_nuevas
+        reparadas = empaquetar(nuevas)
+        for j, (clave_fila, indices) in enumerate(pendientes.items()):
+            if not todas:
+                vecindario[indices] = nuevas[j]
+                valores[indices] = valores_nuevas[j]
+                pesos[indices] = pesos_nuevas[j]
+            self._entradas[clave_fila] = (clave(reparadas[j]), int(valores_nuevas[j]), int(pesos_nuevas[j]))
+        while len(self._entradas) > self.capacidad:
+            self._entradas.popitem(last=False)
+        return valores, pesos
@@ -0,0 +1,69 @@
+import sys
+import argparse
+import numpy as np
+
+
+def empaquetar(soluciones):
+    """Empaqueta soluciones de 0 y 1 a 8 objetos por byte (np.packbits).
+
+    Parámetros
+    ----------
+    soluciones : np.ndarray[uint8]
+        Solución (n,) o matriz (P, n) con una solución por fila.
+
+    Devuelve
+    -------
+    paquetes : np.ndarray[uint8]
+        Array (..., ceil(n/8)); los bits sobrantes del último byte son 0.
+    """
+    return np.packbits(soluciones, axis=-1)
+
+
+def desempaquetar(paquetes, num_items):
+    """Recupera las soluciones (..., num_items) de 0 y 1 a partir de empaquetar()."""
+    return np.unpackbits(paquetes, axis=-1, count=num_items)
+
+
+def clave(paquete):
+    """Clave exacta y hashable de una solución empaquetada (sus bytes)."""
+    return paquete.tobytes()
+
+
+def comprobar(num_items, num_filas=64, semilla=0):
+    """Compara cada núcleo con su equivalente sobre las soluciones desempaquetadas.
+
+    Devuelve
+    -------
+    fallos : [str]
+        Nombre de los núcleos cuyo resultado no coincide.
+    """
+    rng = np.random.default_rng(semilla)
+    soluciones = (rng.random((num_filas, num_items)) < rng.random((num_filas, 1))).view(np.uint8)
+    # algunas filas repetidas, para que clave tenga que distinguir iguales y distintas
+    soluciones[num_filas // 2:] = soluciones[:num_filas - num_filas // 2]
+    paquetes = empaquetar(soluciones)
+    fallos = []
+    if paquetes.shape != (num_filas, -(-num_items // 8)):
+        fallos.append('empaquetar')
+    if not np.array_equal(desempaquetar(paquetes, num_items), soluciones):
+        fallos.append('desempaquetar')
+    claves = [clave(paquete) for paquete in paquetes]
+    distintas = [fila.tobytes() for fila in soluciones]
+    if any((claves[i] == claves[j]) != (distintas[i] == distintas[j])
+           for i in range(num_filas) for j in range(i + 1, num_filas)):
+        fallos.append('clave')
+    return fallos
+
+
+if __name__ == '__main__':
+    # Uso: python empaquetado.py [--items 1 7 8 9 100 5000]
+    parser = argparse.ArgumentParser(description='Comprueba los núcleos de soluciones empaquetadas.')
+    parser.add_argument('--items', type=int, nargs='+', default=[1, 7, 8, 9, 100, 5000],
+                        help='números de objetos con los que se comprueban los núcleos')
+    argumentos = parser.parse_args()
+
+    fallos = [f'{nombre} (n={num_items})' for num_items in argumentos.items for nombre in comprobar(num_items)]
+    if fallos:
+        print('núcleos incorrectos: ' + ', '.join(fallos))
+        sys.exit(1)
+    print('núcleos correctos')
@@ -0,0 +1,41 @@
+import numpy as np
+
+
+class EstadisticasEnLinea:
+    """Media y varianza por generación acumuladas en línea (algoritmo de Welford).
+
+    Cada historial se incorpora en O(generaciones) sin guardar los anteriores,
+    de forma numéricamente estable.
+
+    Atributos
+    ----------
+    n : int
+        Número de historiales agregados.
+    media : np.ndarray[float64]
+        Media de cada generación.
+    """
+
+    def __init__(self, num_columnas):
+        self.n = 0
+        self.media = np.zeros(num_columnas, dtype=np.float64)
+        self._m2 = np.zeros(num_columnas, dtype=np.float64)
+
+    def agregar(self, fila):
+        """Incorpora un historial (vector de una fila por generación)."""
+        fila = np.asarray(fila, dtype=np.float64)
+        self.n += 1
+        delta = fila - self.media
+        self.media += delta / self.n
+        self._m2 += delta * (fila - self.media)
+
+    @property
+    def varianza(self):
+        """Varianza muestral (n - 1) de cada generación; cero con menos de dos historiales."""
+        if self.n < 2:
+            return np.zeros_like(self._m2)
+        return self._m2 / (self.n - 1)
+
+    @property
+    def desviacion(self):
+        """Desviación típica muestral de cada generación."""
+        return np.sqrt(self.varianza)
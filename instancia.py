@@ -0,0 +1,243 @@
+import os
+import sys
+import zipfile
+import numpy as np
+from pathlib import Path
+
+
+# Formato binario .knap: cabecera fija de 64 bytes seguida de las columnas
+# contiguas de valores y pesos (enteros little-endian de 4 u 8 bytes)
+EXTENSION_BINARIA = '.knap'
+MAGIA = b'KNAP'
+VERSION_BINARIA = 1
+CABECERA_BINARIA = np.dtype([
+    ('magia', 'S4'),
+    ('version', '<u4'),
+    ('bytes_entero', '<u4'),
+    ('reservado', '<u4'),
+    ('n', '<i8'),
+    ('c', '<i8'),
+    ('z', '<i8'),
+    ('relleno', 'V24'),
+])
+
+
+class Instancia:
+    """Instancia del problema de la mochila.
+
+    Atributos
+    ----------
+    valores : np.ndarray
+        Valores de los objetos (int64, o el entero nativo de un archivo .knap).
+    pesos : np.ndarray
+        Pesos de los objetos (int64, o el entero nativo de un archivo .knap).
+    capacidad : int
+        Capacidad máxima de peso de la mochila.
+    optimo : int
+        Valor óptimo conocido (z de la cabecera; 0 si no se conoce).
+    nombre : str
+        Nombre de la instancia (por defecto el del archivo sin extensión).
+    """
+
+    def __init__(self, valores, pesos, capacidad, optimo=0, nombre=''):
+        self.valores = _columna(valores)
+        self.pesos = _columna(pesos)
+        self.capacidad = int(capacidad)
+        self.optimo = int(optimo)
+        self.nombre = nombre
+
+    def __len__(self):
+        return len(self.valores)
+
+    def __repr__(self):
+        return f'Instancia({self.nombre!r}, n={len(self)}, c={self.capacidad}, z={self.optimo})'
+
+
+def _columna(datos):
+    # las columnas enteras contiguas (por ejemplo, un np.memmap) se guardan sin copiar
+    if isinstance(datos, np.ndarray) and datos.dtype.kind in 'iu' and datos.flags.c_contiguous:
+        return datos
+    return np.ascontiguousarray(datos, dtype=np.int64)
+
+
+def leer_csv(archivo):
+    """Lee una instancia en el formato de data/ (knapPI_* y toyProblemInstance_*):
+
+      n <num_items>
+      c <capacidad>
+      z <optimo>
+      time 0.00
+      idx,valor,peso,x
+      ...
+
+    Parámetros
+    ----------
+    archivo : Path
+        Archivo CSV de la instancia.
+
+    Devuelve
+    -------
+    instancia : Instancia
+    """
+    archivo = Path(archivo)
+    cabecera = {}
+    lineas_cabecera = 0
+    with open(archivo) as f:
+        for linea in f:
+            linea = linea.strip()
+            if linea and ' ' not in linea:
+                break
+            lineas_cabecera += 1
+            if linea:
+                clave, valor = linea.split()
+                cabecera[clave] = valor
+    columnas = np.loadtxt(archivo, delimiter=',', skiprows=lineas_cabecera, usecols=(1, 2), dtype=np.int64, ndmin=2)
+    return Instancia(columnas[:, 0], columnas[:, 1], int(cabecera['c']), int(cabecera.get('z', 0)), archivo.stem)
+
+
+def ruta_cache(archivo):
+    """Devuelve la ruta de la caché binaria (.npz) asociada al CSV de una instancia."""
+    return Path(archivo).with_suffix('.npz')
+
+
+def cargar_instancia(archivo, cache=True):
+    """Carga una instancia desde su CSV usando una caché binaria .npz junto al archivo.
+
+    La caché guarda el tamaño y la fecha de modificación (mtime) del CSV del que
+    se generó y se regenera cuando no coinciden. Si no se puede escribir la
+    caché (por ejemplo, en un directorio de solo lectura) se lee el CSV sin más.
+
+    Los archivos con extensión .knap se abren directamente con abrir_binaria.
+
+    Parámetros
+    ----------
+    archivo : Path
+        Archivo CSV (o .knap) de la instancia.
+    cache : bool, opcional
+        Si es False se ignora la caché y siempre se lee el CSV.
+
+    Devuelve
+    -------
+    instancia : Instancia
+    """
+    archivo = Path(archivo)
+    if archivo.suffix == EXTENSION_BINARIA:
+        return abrir_binaria(archivo)
+    if not cache:
+        return leer_csv(archivo)
+    estado = archivo.stat()
+    firma = np.array([estado.st_size, estado.st_mtime_ns], dtype=np.int64)
+    destino = ruta_cache(archivo)
+    try:
+        with np.load(destino) as datos:
+            if np.array_equal(datos['firma'], firma):
+                capacidad, optimo = datos['cabecera'].tolist()
+                return Instancia(datos['valores'], datos['pesos'], capacidad, optimo, archivo.stem)
+    except (OSError, KeyError, ValueError, EOFError, zipfile.BadZipFile):
+        pass
+    instancia = leer_csv(archivo)
+    # se escribe en un temporal y se renombra para que otros procesos nunca lean una caché a medias
+    temporal = destino.with_name(f'{destino.stem}.{os.getpid()}.tmp.npz')
+    try:
+        np.savez(temporal, firma=firma, cabecera=np.array([instancia.capacidad, instancia.optimo], dtype=np.int64),
+                 valores=instancia.valores, pesos=instancia.pesos)
+        os.replace(temporal, destino)
+    except OSError:
+        pass
+    return instancia
+
+
+def como_instancia(origen):
+    """Devuelve origen si ya es una Instancia o la carga si es la ruta de un archivo."""
+    if isinstance(origen, Instancia):
+        return origen
+    return cargar_instancia(origen)
+
+
+def escribir_binaria(instancia, destino, dtype=np.int64):
+    """Guarda una instancia en el formato binario .knap.
+
+    Parámetros
+    ----------
+    instancia : Instancia
+        Instancia a guardar.
+    destino : Path
+        Archivo de salida.
+    dtype : np.dtype, opcional
+        Entero de las columnas: np.int64 (por defecto) o np.int32, que ocupa la
+        mitad pero obliga a los solvers a convertir las columnas a int64.
+    """
+    dtype = np.dtype(dtype).newbyteorder('<')
+    if dtype.kind != 'i' or dtype.itemsize not in (4, 8):
+        raise ValueError(f'tipo de columna no soportado: {dtype} (se esperaba int32 o int64)')
+    for columna in (instancia.valores, instancia.pesos):
+        if len(columna) and (columna.min() < np.iinfo(dtype).min or columna.max() > np.iinfo(dtype).max):
+            raise ValueError(f'la instancia {instancia.nombre!r} no cabe en {dtype}')
+    cabecera = np.zeros(1, dtype=CABECERA_BINARIA)
+    cabecera['magia'] = MAGIA
+    cabecera['version'] = VERSION_BINARIA
+    cabecera['bytes_entero'] = dtype.itemsize
+    cabecera['n'] = len(instancia)
+    cabecera['c'] = instancia.capacidad
+    cabecera['z'] = instancia.optimo
+    with open(destino, 'wb') as f:
+        cabecera.tofile(f)
+        instancia.valores.astype(dtype).tofile(f)
+        instancia.pesos.astype(dtype).tofile(f)
+
+
+def abrir_binaria(archivo):
+    """Abre una instancia .knap proyectando sus columnas en memoria con np.memmap.
+
+    No se copia ni se interpreta ningún dato: las páginas se leen bajo demanda
+    y la caché de páginas del sistema operativo se comparte entre procesos.
+
+    Parámetros
+    ----------
+    archivo : Path
+        Archivo .knap de la instancia.
+
+    Devuelve
+    -------
+    instancia : Instancia
+        Instancia con valores y pesos de solo lectura respaldados por el archivo.
+    """
+    archivo = Path(archivo)
+    cabecera = np.fromfile(archivo, dtype=CABECERA_BINARIA, count=1)
+    if len(cabecera) == 0 or cabecera['magia'][0] != MAGIA:
+        raise ValueError(f'{archivo} no es una instancia binaria .knap')
+    if cabecera['version'][0] != VERSION_BINARIA:
+        raise ValueError(f"versión de .knap no soportada: {cabecera['version'][0]}")
+    num_items = int(cabecera['n'][0])
+    dtype = np.dtype(f"<i{int(cabecera['bytes_entero'][0])}")
+    columnas = np.memmap(archivo, dtype=dtype, mode='r', offset=CABECERA_BINARIA.itemsize, shape=(2, num_items))
+    return Instancia(columnas[0], columnas[1], int(cabecera['c'][0]), int(cabecera['z'][0]), archivo.stem)
+
+
+def convertir_csv(archivo, destino=None, dtype=np.int64):
+    """Convierte una instancia CSV (knapPI_*, toyProblemInstance_*) al formato binario .knap.
+
+    Parámetros
+    ----------
+    archivo : Path
+        Archivo CSV de la instancia.
+    destino : Path, opcional
+        Archivo de salida (por defecto el mismo nombre con extensión .knap).
+    dtype : np.dtype, opcional
+        Entero de las columnas (np.int64 o np.int32).
+
+    Devuelve
+    -------
+    destino : Path
+        Archivo .knap generado.
+    """
+    archivo = Path(archivo)
+    destino = archivo.with_suffix(EXTENSION_BINARIA) if destino is None else Path(destino)
+    escribir_binaria(leer_csv(archivo), destino, dtype)
+    return destino
+
+
+if __name__ == '__main__':
+    # Uso: python instancia.py data/*.csv  ->  genera un .knap junto a cada CSV
+    for archivo in sys.argv[1:]:
+        print(convertir_csv(archivo))
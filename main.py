@@ -1,63 +1,75 @@
-import numpy as np
 import math
 from pathlib import Path
 import matplotlib.pyplot as plt
-from QTS import QTS
-from QEA import QEA
-from AE_QTS import AE_QTS
-from multiprocessing import Pool, cpu_count
-from GA import genetic_algorithm
+from instancia import cargar_instancia
+from memoria_compartida import instancia_compartida
+from almacen import AlmacenResultados
+from planificador import (planificar, ejecutar_barrido, recuperar_completadas, HistorialesCompartidos,
+                          con_tiempo_limite, eje_historial)
 
 
 # Parámetros
 num_runs = 100
 num_generaciones = 1000
+# semilla del barrido: cada ejecución recibe un flujo independiente derivado de ella
+# con SeedSequence.spawn (None usa entropía nueva del sistema en cada barrido)
+semilla = None
+# procesos del barrido (None: tantos como núcleos) y tareas por entrega (None: automático)
+num_procesos = None
+tamano_lote = None
+# cada ejecución terminada se guarda en directorio_resultados y, al relanzar el
+# barrido, las ya hechas se leen de ahí (para empezar de cero, borrar el directorio);
+# con periodo_control los solvers guardan además su estado cada tantas iteraciones
+directorio_resultados = Path('./resultados')
+periodo_control = None
+# presupuesto de tiempo por ejecución en segundos: si se indica, todos los algoritmos se
+# comparan a igual tiempo (historial muestreado en el tiempo) en lugar de a igual número
+# de generaciones
+tiempo_limite = None
 #instancia_mochila = Path('./data/toyProblemInstance_100.csv')
 instancia_mochila = Path('./data/toyProblemInstance_250.csv')
 #instancia_mochila = Path('./data/toyProblemInstance_500.csv')
 #instancia_mochila = Path('./data/knapPI_13_500_1000_1.csv')
 #instancia_mochila = Path('data/knapPI_1_5000_1000000_1.csv')
 
-# Función que ejecuta una corrida completa
-def run_algorithms(_):
-    ae_qt = AE_QTS(num_generaciones, 0.1 * math.pi, 100, 2)
-    qt = QTS(num_generaciones, 0.01 * math.pi, 100, 2)
-    qea = QEA(num_generaciones, 0.01 * math.pi, 100, 50, 10)
-    _,historial_ga = genetic_algorithm(instancia_mochila,10,num_generaciones,0.01)
-    _, _, historial_qea = qea.run(instancia_mochila)
-    _, _, historial_qts = qt.run(instancia_mochila)
-    _,_, historial_ae_qts = ae_qt.run(instancia_mochila)
-    
-    return historial_qts, historial_qea, historial_ae_qts,historial_ga
+# Cada ejecución de cada algoritmo es una tarea independiente del planificador; los
+# solvers cuánticos paran al alcanzar el óptimo conocido (su historial se completa con él)
+experimentos = [
+    ('GA', 'GA', dict(population_size=10, generations=num_generaciones, mutation_rate=0.01)),
+    ('QEA', 'QEA', dict(iteraciones=num_generaciones, theta=0.01 * math.pi, tamano_poblacion=100, k=50, periodo_migracion=10, parar_en_optimo=True)),
+    ('QTS', 'QTS', dict(iteraciones=num_generaciones, theta=0.01 * math.pi, tamano_poblacion=100, itt_tabu=2, parar_en_optimo=True)),
+    ('AE_QTS', 'AE_QTS', dict(iteraciones=num_generaciones, theta=0.1 * math.pi, tamano_poblacion=100, iteraciones_tabu=2, parar_en_optimo=True)),
+]
 
+if tiempo_limite is not None:
+    experimentos = con_tiempo_limite(experimentos, tiempo_limite)
 
 if __name__ == '__main__':
-    # Usar tantos procesos como núcleos disponibles
-    with Pool(processes=min(cpu_count(), num_runs)) as pool:
-        resultados = pool.map(run_algorithms, range(num_runs))
+    instancia = cargar_instancia(instancia_mochila)
+    almacen = AlmacenResultados(directorio_resultados / Path(__file__).stem, instancia, periodo_control)
+    tareas = planificar(experimentos, num_runs, len(instancia), almacen.semilla_barrido(semilla))
+    # Los trabajadores escriben cada historial en memoria compartida y las
+    # medias se acumulan en línea según terminan las tareas, en cualquier orden
+    with instancia_compartida(instancia) as descriptor, HistorialesCompartidos(experimentos, num_runs) as historiales:
+        pendientes = recuperar_completadas(tareas, historiales, almacen)
+        for etiqueta, ejecucion in ejecutar_barrido(pendientes, descriptor, historiales, num_procesos, tamano_lote, almacen):
+            historiales.registrar(etiqueta, ejecucion)
+        medias = {etiqueta: estadisticas.media for etiqueta, estadisticas in historiales.estadisticas.items()}
 
-    # Separar los historiales en listas distintas
-    historiales_qts, historiales_qea,historiales_ae_qts,historiales_ga, = zip(*resultados)
-
-    # Convertir a arrays
-    historiales_qts_np = np.array(historiales_qts)
-    historiales_qea_np = np.array(historiales_qea)
-    historiales_ae_qts_np = np.array(historiales_ae_qts)
-    historiales_ga_np = np.array(historiales_ga)
-    # Calcular medias
-    media_qts = np.mean(historiales_qts_np, axis=0)
-    media_qea = np.mean(historiales_qea_np, axis=0)
-    media_ae_qts = np.mean(historiales_ae_qts_np, axis=0)
-    media_ga = np.mean(historiales_ga_np,axis=0)
+    # Medias por generación de cada experimento
+    media_qts = medias['QTS']
+    media_qea = medias['QEA']
+    media_ae_qts = medias['AE_QTS']
+    media_ga = medias['GA']
 
     # Graficar
-    plt.plot(media_qts, marker='o', linestyle='-', color='b', label='QTS')
-    plt.plot(media_qea, marker='s', linestyle='--', color='r', label='QEA')
-    plt.plot(media_ae_qts, marker='o', linestyle='-', color='y', label='AE_QTS')
-    plt.plot(media_ga, marker='o', linestyle='-', color='g', label='GA')
+    plt.plot(eje_historial(len(media_qts), tiempo_limite), media_qts, marker='o', linestyle='-', color='b', label='QTS')
+    plt.plot(eje_historial(len(media_qea), tiempo_limite), media_qea, marker='s', linestyle='--', color='r', label='QEA')
+    plt.plot(eje_historial(len(media_ae_qts), tiempo_limite), media_ae_qts, marker='o', linestyle='-', color='y', label='AE_QTS')
+    plt.plot(eje_historial(len(media_ga), tiempo_limite), media_ga, marker='o', linestyle='-', color='g', label='GA')
 
     plt.title(f'Fitness promedio durante {num_runs} ejecuciones')
-    plt.xlabel('Generación')
+    plt.xlabel('Generación' if tiempo_limite is None else 'Tiempo (s)')
     plt.ylabel('Fitness promedio')
     plt.grid(True)
     plt.legend()
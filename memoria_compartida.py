@@ -0,0 +1,160 @@
+import sys
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+import numpy as np
+from instancia import Instancia
+
+
+class InstanciaCompartida:
+    """Descripción (serializable) de una instancia publicada en memoria compartida.
+
+    Es lo único que viaja a los procesos trabajadores: el nombre del bloque de
+    memoria y la cabecera de la instancia; las columnas se leen del bloque.
+
+    Atributos
+    ----------
+    nombre_memoria : str
+        Nombre del bloque de multiprocessing.shared_memory.
+    num_items : int
+        Número de objetos de la instancia.
+    capacidad : int
+        Capacidad máxima de peso de la mochila.
+    optimo : int
+        Valor óptimo conocido (0 si no se conoce).
+    nombre : str
+        Nombre de la instancia.
+    """
+
+    def __init__(self, nombre_memoria, num_items, capacidad, optimo, nombre):
+        self.nombre_memoria = nombre_memoria
+        self.num_items = num_items
+        self.capacidad = capacidad
+        self.optimo = optimo
+        self.nombre = nombre
+
+
+class MatrizCompartida:
+    """Descripción (serializable) de una matriz publicada en memoria compartida.
+
+    Atributos
+    ----------
+    nombre_memoria : str
+        Nombre del bloque de multiprocessing.shared_memory.
+    forma : tuple
+        Forma de la matriz.
+    dtype : str
+        Tipo de los elementos (por ejemplo 'int64').
+    """
+
+    def __init__(self, nombre_memoria, forma, dtype):
+        self.nombre_memoria = nombre_memoria
+        self.forma = forma
+        self.dtype = dtype
+
+
+def _abrir_bloque(nombre_memoria):
+    if sys.version_info >= (3, 13):
+        # el proceso que publica es el único responsable de liberar el bloque
+        return shared_memory.SharedMemory(name=nombre_memoria, track=False)
+    return shared_memory.SharedMemory(name=nombre_memoria)
+
+
+def publicar_instancia(instancia):
+    """Copia las columnas de la instancia a un bloque de memoria compartida.
+
+    Parámetros
+    ----------
+    instancia : Instancia
+        Instancia ya cargada en el proceso padre.
+
+    Devuelve
+    -------
+    memoria : shared_memory.SharedMemory
+        Bloque creado; quien publica debe cerrarlo y liberarlo (close/unlink).
+    descriptor : InstanciaCompartida
+        Descripción para adjuntar la instancia desde otros procesos.
+    """
+    num_items = len(instancia)
+    memoria = shared_memory.SharedMemory(create=True, size=max(1, 2 * num_items * np.dtype(np.int64).itemsize))
+    columnas = np.ndarray((2, num_items), dtype=np.int64, buffer=memoria.buf)
+    columnas[0] = instancia.valores
+    columnas[1] = instancia.pesos
+    descriptor = InstanciaCompartida(memoria.name, num_items, instancia.capacidad, instancia.optimo, instancia.nombre)
+    return memoria, descriptor
+
+
+def adjuntar_instancia(descriptor):
+    """Construye una Instancia cuyas columnas son vistas (sin copia) del bloque compartido.
+
+    La instancia guarda el bloque en el atributo memoria_compartida para que
+    siga abierto mientras se use.
+
+    Parámetros
+    ----------
+    descriptor : InstanciaCompartida
+        Descripción devuelta por publicar_instancia.
+
+    Devuelve
+    -------
+    instancia : Instancia
+    """
+    memoria = _abrir_bloque(descriptor.nombre_memoria)
+    columnas = np.ndarray((2, descriptor.num_items), dtype=np.int64, buffer=memoria.buf)
+    columnas.flags.writeable = False
+    instancia = Instancia(columnas[0], columnas[1], descriptor.capacidad, descriptor.optimo, descriptor.nombre)
+    instancia.memoria_compartida = memoria
+    return instancia
+
+
+@contextmanager
+def instancia_compartida(instancia):
+    """Publica la instancia durante el bloque with y la libera al salir.
+
+    Ejemplo
+    -------
+    with instancia_compartida(cargar_instancia(ruta)) as descriptor:
+        with Pool(initializer=inicializar_proceso, initargs=(descriptor,)) as pool:
+            ...
+    """
+    memoria, descriptor = publicar_instancia(instancia)
+    try:
+        yield descriptor
+    finally:
+        memoria.close()
+        memoria.unlink()
+
+
+def publicar_matriz(forma, dtype=np.int64):
+    """Crea una matriz inicializada a cero en un bloque de memoria compartida.
+
+    Parámetros
+    ----------
+    forma : tuple
+        Forma de la matriz.
+    dtype : np.dtype, opcional
+        Tipo de los elementos (por defecto np.int64).
+
+    Devuelve
+    -------
+    memoria : shared_memory.SharedMemory
+        Bloque creado; quien publica debe cerrarlo y liberarlo (close/unlink).
+    matriz : np.ndarray
+        Vista de la matriz en el proceso que publica.
+    descriptor : MatrizCompartida
+        Descripción para adjuntar la matriz desde otros procesos.
+    """
+    forma = tuple(int(d) for d in forma)
+    dtype = np.dtype(dtype)
+    memoria = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(forma)) * dtype.itemsize))
+    matriz = np.ndarray(forma, dtype=dtype, buffer=memoria.buf)
+    matriz[...] = 0
+    return memoria, matriz, MatrizCompartida(memoria.name, forma, dtype.str)
+
+
+def adjuntar_matriz(descriptor):
+    """Devuelve (memoria, matriz) con una vista escribible de una matriz publicada.
+
+    La memoria devuelta debe seguir abierta mientras se use la matriz.
+    """
+    memoria = _abrir_bloque(descriptor.nombre_memoria)
+    return memoria, np.ndarray(descriptor.forma, dtype=descriptor.dtype, buffer=memoria.buf)
@@ -0,0 +1,83 @@
+import time
+import numpy as np
+
+
+# Motivos por los que termina una ejecución ('iteraciones' si agota todas)
+CRITERIOS_PARADA = ('iteraciones', 'objetivo', 'optimo', 'estancamiento', 'colapso', 'tiempo')
+
+
+class CriterioParada:
+    """Criterios de terminación anticipada de un solver.
+
+    Todos son opcionales; con los valores por defecto la ejecución solo termina
+    al agotar las iteraciones.
+
+    Atributos
+    ----------
+    objetivo : int o None
+        Se para al alcanzar una solución de valor >= objetivo.
+    optimo : int o None
+        Valor óptimo conocido (z de la instancia); se para al alcanzarlo.
+    max_sin_mejora : int o None
+        Se para tras max_sin_mejora iteraciones seguidas sin mejorar la mejor solución.
+    epsilon_colapso : float o None
+        Se para cuando todos los qubits han colapsado: beta**2 a menos de
+        epsilon_colapso de 0 o de 1.
+    tiempo_limite : float o None
+        Presupuesto de tiempo real en segundos, contado desde inicio; se para al agotarlo
+        y el solver devuelve la mejor solución encontrada hasta entonces.
+    inicio : float
+        Instante de inicio de la ejecución (time.perf_counter); por defecto, al crear el criterio.
+    """
+
+    def __init__(self, objetivo=None, optimo=None, max_sin_mejora=None, epsilon_colapso=None, tiempo_limite=None):
+        self.objetivo = objetivo
+        # un óptimo 0 en la cabecera significa que no se conoce
+        self.optimo = optimo or None
+        self.max_sin_mejora = max_sin_mejora
+        self.epsilon_colapso = epsilon_colapso
+        self.tiempo_limite = tiempo_limite
+        self.inicio = time.perf_counter()
+
+    def transcurrido(self):
+        """Segundos transcurridos desde el inicio de la ejecución."""
+        return time.perf_counter() - self.inicio
+
+    def reanudar(self, transcurrido):
+        """Ajusta el inicio para que el reloj continúe desde transcurrido segundos (al
+        reanudar desde un punto de control)."""
+        self.inicio = time.perf_counter() - transcurrido
+
+    def comprobar(self, mejor_valor, iter_sin_mejora, registro=None):
+        """Devuelve el criterio que se cumple (ver CRITERIOS_PARADA) o None para seguir.
+
+        Parámetros
+        ----------
+        mejor_valor : int
+            Valor de la mejor solución encontrada.
+        iter_sin_mejora : int
+            Iteraciones seguidas sin mejorar la mejor solución.
+        registro : RegistroCuantico, opcional
+            Registro de qubits del solver (solo para el criterio de colapso).
+        """
+        if self.optimo is not None and mejor_valor >= self.optimo:
+            return 'optimo'
+        if self.objetivo is not None and mejor_valor >= self.objetivo:
+            return 'objetivo'
+        if self.max_sin_mejora is not None and iter_sin_mejora >= self.max_sin_mejora:
+            return 'estancamiento'
+        if self.tiempo_limite is not None and self.transcurrido() >= self.tiempo_limite:
+            return 'tiempo'
+        if self.epsilon_colapso is not None and registro is not None:
+            probabilidades = registro.probabilidades()
+            if np.all(np.minimum(probabilidades, 1 - probabilidades) <= self.epsilon_colapso):
+                return 'colapso'
+        return None
+
+
+def rellenar_historial(historial, longitud):
+    """Completa un historial cortado por una parada anticipada repitiendo su último
+    valor, para que todas las ejecuciones tengan la misma longitud al promediarlas."""
+    if len(historial) < longitud:
+        historial.extend([historial[-1]] * (longitud - len(historial)))
+    return historial
@@ -0,0 +1,73 @@
+import time
+
+
+class Perfil:
+    """Tiempo acumulado y número de llamadas por fase de un solver, más contadores
+    de eventos (reparaciones, objetos quitados y añadidos, mutaciones...).
+
+    Los solvers solo lo consultan si el perfilado está activado: con perfil=None
+    el coste es una comprobación de variable local por fase.
+
+    Las fases se miden encadenadas: marca() devuelve el instante actual y
+    fase(nombre, desde) suma a la fase el tiempo transcurrido desde desde y
+    devuelve el nuevo instante, que sirve de inicio a la fase siguiente.
+
+    Atributos
+    ----------
+    tiempos : dict[str, float]
+        Segundos acumulados por fase.
+    llamadas : dict[str, int]
+        Veces que se ha ejecutado cada fase.
+    contadores : dict[str, int]
+        Contadores de eventos.
+    callback : callable, opcional
+        Función a la que se pasa resumen() al terminar cada ejecución.
+    """
+
+    def __init__(self, callback=None):
+        self.tiempos = {}
+        self.llamadas = {}
+        self.contadores = {}
+        self.callback = callback
+
+    def marca(self):
+        """Devuelve el instante actual (time.perf_counter)."""
+        return time.perf_counter()
+
+    def fase(self, nombre, desde):
+        """Suma a la fase nombre el tiempo transcurrido desde desde y devuelve el instante actual."""
+        ahora = time.perf_counter()
+        self.tiempos[nombre] = self.tiempos.get(nombre, 0.0) + ahora - desde
+        self.llamadas[nombre] = self.llamadas.get(nombre, 0) + 1
+        return ahora
+
+    def contar(self, nombre, cantidad=1):
+        """Suma cantidad al contador nombre."""
+        self.contadores[nombre] = self.contadores.get(nombre, 0) + int(cantidad)
+
+    def resumen(self):
+        """Devuelve una copia de los tiempos, llamadas y contadores acumulados."""
+        return {'tiempos': dict(self.tiempos), 'llamadas': dict(self.llamadas), 'contadores': dict(self.contadores)}
+
+    def terminar(self):
+        """Se llama al acabar una ejecución: envía el resumen al callback, si lo hay."""
+        if self.callback is not None:
+            self.callback(self.resumen())
+
+
+def crear_perfil(perfil):
+    """Normaliza la opción de perfilado de un solver.
+
+    None o False lo desactivan, True crea un Perfil nuevo, una función crea un
+    Perfil que le enviará el resumen y un Perfil se usa tal cual (acumulando
+    varias ejecuciones).
+    """
+    if perfil is None or perfil is False:
+        return None
+    if perfil is True:
+        return Perfil()
+    if isinstance(perfil, Perfil):
+        return perfil
+    if callable(perfil):
+        return Perfil(perfil)
+    raise TypeError(f'opción de perfilado no válida: {perfil!r}')
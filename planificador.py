@@ -0,0 +1,307 @@
+import numpy as np
+from multiprocessing import Pool, cpu_count
+from QTS import QTS
+from QEA import QEA
+from AE_QTS import AE_QTS
+from GA import genetic_algorithm
+from memoria_compartida import adjuntar_instancia, publicar_matriz, adjuntar_matriz
+from estadisticas import EstadisticasEnLinea
+
+
+# Algoritmos que puede ejecutar una tarea: clase del solver (o función, en el GA)
+ALGORITMOS = {
+    'QTS': QTS,
+    'AE_QTS': AE_QTS,
+    'QEA': QEA,
+    'GA': genetic_algorithm,
+}
+
+# Con presupuesto de tiempo los historiales se muestrean en PUNTOS_TIEMPO instantes
+# equiespaciados hasta el límite, para comparar algoritmos a igual tiempo de cálculo
+PUNTOS_TIEMPO = 100
+
+# La instancia se lee una sola vez en el proceso padre y los trabajadores la
+# adjuntan desde memoria compartida al arrancar (ver inicializar_proceso), junto
+# con las matrices de resultados en las que escriben cada historial y, si lo
+# hay, el almacén en disco donde se guarda cada tarea terminada
+instancia = None
+resultados = {}
+almacen = None
+_memorias = []
+
+
+def inicializar_proceso(descriptor, descriptores_resultados, almacen_resultados=None):
+    global instancia, almacen
+    instancia = adjuntar_instancia(descriptor)
+    almacen = almacen_resultados
+    for etiqueta, descriptor_matriz in descriptores_resultados.items():
+        memoria, resultados[etiqueta] = adjuntar_matriz(descriptor_matriz)
+        _memorias.append(memoria)
+
+
+class Tarea:
+    """Unidad de trabajo del planificador: una ejecución de un algoritmo.
+
+    Atributos
+    ----------
+    etiqueta : str
+        Nombre con el que se agregan los resultados (por ejemplo 'QTS' o 'theta=0.1pi').
+    algoritmo : str
+        Clave de ALGORITMOS.
+    parametros : dict
+        Argumentos del constructor del solver (o de genetic_algorithm), sin la semilla.
+    ejecucion : int
+        Índice de la ejecución dentro del barrido.
+    semilla : np.random.SeedSequence
+        Semilla propia de la ejecución.
+    coste : float
+        Coste esperado (unidades arbitrarias); las tareas más caras se reparten primero.
+    """
+
+    def __init__(self, etiqueta, algoritmo, parametros, ejecucion, semilla, coste):
+        self.etiqueta = etiqueta
+        self.algoritmo = algoritmo
+        self.parametros = parametros
+        self.ejecucion = ejecucion
+        self.semilla = semilla
+        self.coste = coste
+
+
+def tiempo_limite(algoritmo, parametros):
+    """Presupuesto de tiempo de un experimento en segundos (None si se limita por iteraciones)."""
+    return parametros.get('time_budget' if algoritmo == 'GA' else 'tiempo_limite')
+
+
+def con_tiempo_limite(experimentos, limite):
+    """Convierte experimentos por iteraciones en experimentos a igual tiempo: sin límite
+    de iteraciones y con limite segundos por ejecución."""
+    convertidos = []
+    for etiqueta, algoritmo, parametros in experimentos:
+        parametros = dict(parametros)
+        if algoritmo == 'GA':
+            parametros.update(generations=None, time_budget=limite)
+        else:
+            parametros.update(iteraciones=None, tiempo_limite=limite)
+        convertidos.append((etiqueta, algoritmo, parametros))
+    return convertidos
+
+
+def rejilla_tiempo(limite, puntos=PUNTOS_TIEMPO):
+    """Instantes (segundos) en los que se muestrea el historial con presupuesto de tiempo."""
+    return limite * np.arange(1, puntos + 1) / puntos
+
+
+def muestrear_en_tiempo(historial, tiempos, rejilla):
+    """Devuelve el valor del historial vigente en cada instante de la rejilla, es decir,
+    el último registrado antes de ese instante (o el primero si aún no había ninguno)."""
+    indices = np.searchsorted(tiempos, rejilla, side='right') - 1
+    return np.asarray(historial[:len(tiempos)])[np.maximum(indices, 0)]
+
+
+def eje_historial(longitud, limite=None):
+    """Eje x de un historial agregado: generaciones o, con presupuesto de tiempo, segundos."""
+    return np.arange(longitud) if limite is None else rejilla_tiempo(limite, longitud)
+
+
+def coste_estimado(algoritmo, parametros, num_items):
+    """Estima el coste de una ejecución como iteraciones x población x objetos (o, con
+    presupuesto de tiempo, como el propio presupuesto)."""
+    if tiempo_limite(algoritmo, parametros) is not None:
+        return tiempo_limite(algoritmo, parametros)
+    if algoritmo == 'GA':
+        return parametros.get('generations', 100) * parametros.get('population_size', 100) * num_items
+    return parametros['iteraciones'] * parametros['tamano_poblacion'] * num_items
+
+
+def longitud_historial(algoritmo, parametros):
+    """Número de valores del historial de una ejecución."""
+    if tiempo_limite(algoritmo, parametros) is not None:
+        return PUNTOS_TIEMPO
+    # los historiales guardan también la población o solución inicial
+    if algoritmo == 'GA':
+        return parametros.get('generations', 100) + 1
+    return parametros['iteraciones'] + 1
+
+
+def planificar(experimentos, num_runs, num_items, semilla=None):
+    """Genera las tareas de un barrido, de la más cara a la más barata.
+
+    La ejecución r de cada experimento usa el hijo r de SeedSequence(semilla) y,
+    dentro de él, el nieto correspondiente a la posición del experimento, de modo
+    que cada tarea tiene un flujo independiente que no depende del orden de reparto.
+
+    Parámetros
+    ----------
+    experimentos : [(str, str, dict)]
+        Lista de (etiqueta, algoritmo, parametros).
+    num_runs : int
+        Número de ejecuciones por experimento.
+    num_items : int
+        Número de objetos de la instancia (para estimar el coste).
+    semilla : int, opcional
+        Semilla del barrido (None usa entropía nueva del sistema).
+
+    Devuelve
+    -------
+    tareas : [Tarea]
+    """
+    tareas = []
+    for ejecucion, semilla_ejecucion in enumerate(np.random.SeedSequence(semilla).spawn(num_runs)):
+        semillas = semilla_ejecucion.spawn(len(experimentos))
+        for (etiqueta, algoritmo, parametros), semilla_tarea in zip(experimentos, semillas):
+            coste = coste_estimado(algoritmo, parametros, num_items)
+            tareas.append(Tarea(etiqueta, algoritmo, parametros, ejecucion, semilla_tarea, coste))
+    # orden estable: a igual coste se conserva el orden de ejecución
+    tareas.sort(key=lambda tarea: -tarea.coste)
+    return tareas
+
+
+def ejecutar_tarea(tarea):
+    """Ejecuta una tarea en el proceso trabajador, escribe su historial en la fila
+    ejecucion de la matriz compartida de su etiqueta y devuelve (etiqueta, ejecucion)."""
+    punto_control = None if almacen is None else almacen.ruta_punto_control(tarea)
+    if tarea.algoritmo == 'GA':
+        if punto_control is not None:
+            control = dict(checkpoint=punto_control, checkpoint_every=almacen.periodo_control)
+        else:
+            control = {}
+        solucion, historial = genetic_algorithm(instancia, seed=tarea.semilla, **control, **tarea.parametros)
+        tiempos = solucion['times']
+    else:
+        if punto_control is not None:
+            control = dict(punto_control=punto_control, periodo_control=almacen.periodo_control)
+        else:
+            control = {}
+        solver = ALGORITMOS[tarea.algoritmo](semilla=tarea.semilla, **control, **tarea.parametros)
+        _, _, historial = solver.run(instancia)
+        tiempos = solver.historial_tiempos
+    limite = tiempo_limite(tarea.algoritmo, tarea.parametros)
+    if limite is not None:
+        historial = muestrear_en_tiempo(historial, tiempos, rejilla_tiempo(limite))
+    resultados[tarea.etiqueta][tarea.ejecucion] = historial
+    if almacen is not None:
+        almacen.guardar(tarea, historial)
+    return tarea.etiqueta, tarea.ejecucion
+
+
+def recuperar_completadas(tareas, historiales, almacen_resultados):
+    """Registra en historiales las tareas ya guardadas en el almacén y devuelve las pendientes.
+
+    Devuelve
+    -------
+    pendientes : [Tarea]
+        Tareas sin registro en el almacén, en el mismo orden.
+    """
+    pendientes = []
+    for tarea in tareas:
+        historial = almacen_resultados.cargar(tarea)
+        if historial is None or len(historial) != historiales.historiales[tarea.etiqueta].shape[1]:
+            pendientes.append(tarea)
+            continue
+        historiales.historiales[tarea.etiqueta][tarea.ejecucion] = historial
+        historiales.registrar(tarea.etiqueta, tarea.ejecucion)
+    return pendientes
+
+
+def tamano_lote_por_defecto(num_tareas, procesos):
+    """Lote pequeño para repartir bien la carga: unas 16 entregas por proceso."""
+    return max(1, num_tareas // (procesos * 16))
+
+
+def ejecutar_barrido(tareas, descriptor, historiales, procesos=None, tamano_lote=None, almacen_resultados=None):
+    """Reparte las tareas entre procesos y entrega los resultados según terminan.
+
+    Usa Pool.imap_unordered sobre las tareas ya ordenadas de más a menos caras:
+    las ejecuciones largas empiezan primero y las cortas rellenan los huecos
+    del final, en lugar de esperar a la cadena de tareas más lenta.
+
+    Parámetros
+    ----------
+    tareas : [Tarea]
+        Tareas del barrido (ver planificar).
+    descriptor : InstanciaCompartida
+        Instancia publicada en memoria compartida.
+    historiales : HistorialesCompartidos
+        Matrices compartidas en las que los trabajadores escriben los historiales.
+    procesos : int, opcional
+        Número de procesos (por defecto, los núcleos disponibles).
+    tamano_lote : int, opcional
+        Tareas que recibe cada proceso por entrega (por defecto, tamano_lote_por_defecto).
+    almacen_resultados : AlmacenResultados, opcional
+        Almacén en disco donde cada trabajador guarda las tareas que termina.
+
+    Devuelve
+    -------
+    resultados : iterador de (etiqueta, ejecucion)
+        Filas ya escritas en historiales.
+    """
+    procesos = min(procesos or cpu_count(), max(1, len(tareas)))
+    if tamano_lote is None:
+        tamano_lote = tamano_lote_por_defecto(len(tareas), procesos)
+    with Pool(processes=procesos, initializer=inicializar_proceso, initargs=(descriptor, historiales.descriptores, almacen_resultados)) as pool:
+        yield from pool.imap_unordered(ejecutar_tarea, tareas, chunksize=tamano_lote)
+
+
+class HistorialesCompartidos:
+    """Matrices (num_runs, generaciones) en memoria compartida, una por etiqueta,
+    con estadísticas en línea de las ejecuciones completadas.
+
+    Los trabajadores escriben cada historial directamente en su fila, de modo que
+    solo viaja de vuelta (etiqueta, ejecucion) y la memoria del proceso padre no
+    crece con el número de ejecuciones. Se usa como gestor de contexto: al salir
+    se liberan los bloques, así que las matrices deben copiarse antes si se
+    necesitan después.
+
+    Atributos
+    ----------
+    historiales : dict[str, np.ndarray[int64]]
+        Matriz de historiales de cada etiqueta.
+    completadas : dict[str, np.ndarray[bool]]
+        Ejecuciones ya registradas de cada etiqueta.
+    estadisticas : dict[str, EstadisticasEnLinea]
+        Media y varianza por generación de las ejecuciones registradas.
+    descriptores : dict[str, MatrizCompartida]
+        Descripción de cada matriz para adjuntarla desde los trabajadores.
+    """
+
+    def __init__(self, experimentos, num_runs):
+        self._memorias = []
+        self.historiales = {}
+        self.completadas = {}
+        self.estadisticas = {}
+        self.descriptores = {}
+        try:
+            for etiqueta, algoritmo, parametros in experimentos:
+                longitud = longitud_historial(algoritmo, parametros)
+                memoria, matriz, descriptor = publicar_matriz((num_runs, longitud))
+                self._memorias.append(memoria)
+                self.historiales[etiqueta] = matriz
+                self.completadas[etiqueta] = np.zeros(num_runs, dtype=bool)
+                self.estadisticas[etiqueta] = EstadisticasEnLinea(longitud)
+                self.descriptores[etiqueta] = descriptor
+        except BaseException:
+            self.cerrar()
+            raise
+
+    def registrar(self, etiqueta, ejecucion):
+        """Incorpora a las estadísticas la fila que acaba de escribir un trabajador."""
+        self.completadas[etiqueta][ejecucion] = True
+        self.estadisticas[etiqueta].agregar(self.historiales[etiqueta][ejecucion])
+
+    def cuantiles(self, etiqueta, q):
+        """Cuantiles q por generación de las ejecuciones registradas de una etiqueta."""
+        return np.quantile(self.historiales[etiqueta][self.completadas[etiqueta]], q, axis=0)
+
+    def cerrar(self):
+        """Libera los bloques de memoria compartida."""
+        self.historiales = {}
+        for memoria in self._memorias:
+            memoria.close()
+            memoria.unlink()
+        self._memorias = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
@@ -0,0 +1,65 @@
+import os
+import json
+import zipfile
+import numpy as np
+from pathlib import Path
+
+
+def guardar_punto_control(ruta, firma, rng, **estado):
+    """Guarda el estado de una ejecución en un .npz comprimido.
+
+    El archivo se escribe en un temporal y se renombra, de modo que una
+    interrupción a mitad de escritura deja intacto el punto de control anterior.
+
+    Parámetros
+    ----------
+    ruta : Path
+        Archivo del punto de control.
+    firma : str
+        Descripción del solver y la instancia; cargar_punto_control la compara
+        para no reanudar con otros parámetros.
+    rng : np.random.Generator
+        Generador de la ejecución; se guarda el estado de su bit_generator.
+    **estado : np.ndarray o escalar
+        Arrays y escalares con el estado del solver.
+    """
+    ruta = Path(ruta)
+    temporal = ruta.with_name(f'{ruta.stem}.{os.getpid()}.tmp.npz')
+    np.savez_compressed(temporal, firma=np.array(firma), estado_rng=np.array(json.dumps(rng.bit_generator.state)),
+                        **estado)
+    os.replace(temporal, ruta)
+
+
+def cargar_punto_control(ruta, firma, rng):
+    """Carga un punto de control guardado con guardar_punto_control.
+
+    Parámetros
+    ----------
+    ruta : Path
+        Archivo del punto de control.
+    firma : str
+        Firma del solver actual.
+    rng : np.random.Generator
+        Generador de la ejecución; se le restaura el estado guardado.
+
+    Devuelve
+    -------
+    estado : dict[str, np.ndarray] o None
+        Estado guardado (los escalares como arrays de dimensión 0), o None si
+        no hay punto de control o está dañado.
+    """
+    try:
+        with np.load(ruta) as datos:
+            estado = {nombre: datos[nombre] for nombre in datos.files}
+    except (OSError, ValueError, EOFError, zipfile.BadZipFile):
+        return None
+    if str(estado.pop('firma')) != firma:
+        raise ValueError(f'el punto de control {ruta} corresponde a otra ejecución')
+    rng.bit_generator.state = json.loads(str(estado.pop('estado_rng')))
+    return estado
+
+
+def firma_punto_control(algoritmo, instancia, **parametros):
+    """Describe un solver y su instancia para validar los puntos de control."""
+    return json.dumps({'algoritmo': algoritmo, 'num_items': len(instancia), 'capacidad': instancia.capacidad,
+                       'parametros': parametros}, sort_keys=True)
@@ -0,0 +1,260 @@
+import numpy as np
+import math
+
+
+REPRESENTACIONES = ('amplitudes', 'angulos')
+
+
+def muestrear(probabilidades, forma=None, rng=None):
+    """Mide en bloque comparando una sola matriz de números aleatorios entre [0,1)
+    con las probabilidades de obtener 1.
+
+    Parámetros
+    ----------
+    probabilidades : np.ndarray[float64]
+        beta**2 de cada qubit; vector (n,) o matriz (P, n).
+    forma : tuple, opcional
+        Forma de la medición (por defecto la de probabilidades). Con un vector
+        de probabilidades y forma (P, n) se obtienen P mediciones del mismo registro.
+    rng : np.random.Generator, opcional
+        Generador del que se extraen los números (por defecto el estado global np.random).
+
+    Devuelve
+    -------
+    mediciones : np.ndarray[uint8]
+        Matriz de 0 y 1 con la forma pedida.
+    """
+    if forma is None:
+        forma = probabilidades.shape
+    aleatorios = np.random.random_sample(forma) if rng is None else rng.random(forma)
+    return (aleatorios < probabilidades).view(np.uint8)
+
+
+def _forma_estado(num_items, tamano_poblacion):
+    return num_items if tamano_poblacion is None else (tamano_poblacion, num_items)
+
+
+class RegistroCuantico:
+    """Registro de qubits del problema de la mochila almacenado en arrays contiguos.
+
+    Sustituye a la lista de QObjeto: el qubit i-ésimo está formado por
+    alpha[i] y beta[i] y representa al objeto de valor valores[i] y peso pesos[i].
+
+    Atributos
+    ----------
+    valores : np.ndarray[int64]
+        Valores de los objetos de la instancia.
+    pesos : np.ndarray[int64]
+        Pesos de los objetos de la instancia.
+    alpha : np.ndarray[float64]
+        Amplitudes alpha de los qubits (por defecto math.sqrt(1/2)).
+    beta : np.ndarray[float64]
+        Amplitudes beta de los qubits (por defecto math.sqrt(1/2)).
+
+    Con tamano_poblacion el registro guarda una población de individuos:
+    alpha y beta pasan a ser matrices (tamano_poblacion, n) que comparten
+    una única tabla de objetos.
+    """
+
+    # arrays con el estado propio de cada copia del registro
+    _estado = ('alpha', 'beta')
+
+    def __init__(self, valores, pesos, alpha=math.sqrt(1/2), beta=math.sqrt(1/2), tamano_poblacion=None):
+        self.valores = np.ascontiguousarray(valores, dtype=np.int64)
+        self.pesos = np.ascontiguousarray(pesos, dtype=np.int64)
+        # tabla (n, 2) en coma flotante para evaluar vecindarios con un único producto BLAS;
+        # las sumas son exactas mientras no superen 2**53
+        self.tabla = np.column_stack((self.valores, self.pesos)).astype(np.float64)
+        forma = _forma_estado(len(self.valores), tamano_poblacion)
+        self.alpha = np.full(forma, alpha, dtype=np.float64)
+        self.beta = np.full(forma, beta, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.valores)
+
+    def copia(self):
+        """Devuelve un registro con amplitudes propias que comparte la tabla de objetos."""
+        registro = object.__new__(type(self))
+        registro.__dict__.update(self.__dict__)
+        for nombre in self._estado:
+            setattr(registro, nombre, getattr(self, nombre).copy())
+        return registro
+
+    def exportar_estado(self):
+        """Devuelve un diccionario con copias de los arrays de estado (para puntos de control)."""
+        return {nombre: getattr(self, nombre).copy() for nombre in self._estado}
+
+    def restaurar_estado(self, estado):
+        """Restaura los arrays de estado guardados con exportar_estado."""
+        for nombre in self._estado:
+            valor = np.array(estado[nombre], dtype=np.float64)
+            if valor.shape != getattr(self, nombre).shape:
+                raise ValueError(f'el estado {nombre!r} tiene forma {valor.shape}, se esperaba {getattr(self, nombre).shape}')
+            setattr(self, nombre, valor)
+
+    def probabilidades(self):
+        """Devuelve la probabilidad de medir 1 en cada qubit (beta**2)."""
+        return self.beta**2
+
+    def signos_opuestos(self):
+        """Devuelve la máscara de los qubits con alpha * beta < 0."""
+        return self.alpha * self.beta < 0
+
+    def medir(self, rng=None):
+        """Mide todos los qubits del registro comparando con números aleatorios entre [0,1).
+
+        Parámetros
+        ----------
+        rng : np.random.Generator, opcional
+            Generador de números aleatorios (por defecto el estado global np.random).
+
+        Devuelve
+        -------
+        solucion : np.ndarray[uint8]
+            0 o 1 por cada qubit dependiendo de beta**2 y el número aleatorio generado.
+        """
+        return muestrear(self.probabilidades(), rng=rng)
+
+    def medir_vecindario(self, tamano_poblacion, rng=None):
+        """Mide el registro tamano_poblacion veces con una única extracción aleatoria.
+
+        Parámetros
+        ----------
+        tamano_poblacion : int
+            Número de soluciones vecinas a medir.
+        rng : np.random.Generator, opcional
+            Generador de números aleatorios (por defecto el estado global np.random).
+
+        Devuelve
+        -------
+        vecindario : np.ndarray[uint8]
+            Matriz (tamano_poblacion, n) con una solución vecina por fila.
+        """
+        return muestrear(self.probabilidades(), (tamano_poblacion, len(self)), rng)
+
+    def rotar(self, angulos, mascara=None):
+        """Aplica a cada qubit la matriz de rotación de su ángulo.
+
+        Parámetros
+        ----------
+        angulos : np.ndarray[float64] o float
+            Ángulo de rotación por qubit (un ángulo 0 deja el qubit igual).
+        mascara : np.ndarray[bool], opcional
+            Si se indica, solo se rotan los qubits marcados y angulos contiene
+            únicamente sus ángulos (en el orden de alpha[mascara]).
+        """
+        cos = np.cos(angulos)
+        sin = np.sin(angulos)
+        if mascara is not None:
+            alpha_old = self.alpha[mascara]
+            beta_old = self.beta[mascara]
+            self.alpha[mascara] = cos * alpha_old - sin * beta_old
+            self.beta[mascara] = sin * alpha_old + cos * beta_old
+            return
+        alpha_old = self.alpha
+        beta_old = self.beta
+        self.alpha = cos * alpha_old - sin * beta_old
+        self.beta = sin * alpha_old + cos * beta_old
+
+    def evaluar(self, solucion):
+        """Evalúa el valor y peso de la solución dada.
+
+        Parámetros
+        ----------
+        solucion : np.ndarray
+            Solución obtenida de una medición del registro.
+
+        Devuelve
+        -------
+        valor : int
+            Valor total de la solución evaluada.
+        peso : int
+            Peso total de la solución evaluada.
+        """
+        return int(solucion @ self.valores), int(solucion @ self.pesos)
+
+    def evaluar_vecindario(self, vecindario):
+        """Evalúa todas las soluciones del vecindario con un único producto matricial.
+
+        Parámetros
+        ----------
+        vecindario : np.ndarray
+            Matriz (P, n) de soluciones, una por fila.
+
+        Devuelve
+        -------
+        valores : np.ndarray[int64]
+            Valor total de cada solución.
+        pesos : np.ndarray[int64]
+            Peso total de cada solución.
+        """
+        totales = (vecindario @ self.tabla).astype(np.int64)
+        return totales[:, 0], totales[:, 1]
+
+
+class RegistroAngular(RegistroCuantico):
+    """Registro de qubits representado por un único ángulo por qubit.
+
+    El qubit i-ésimo es (alpha, beta) = (cos fase[i], sin fase[i]), de modo que
+    una rotación es una suma de ángulos y la probabilidad de medir 1 es sin**2.
+    Guarda la mitad de estado que RegistroCuantico y no evalúa trigonometría al
+    rotar; alpha y beta se calculan solo si se consultan.
+
+    Atributos
+    ----------
+    fase : np.ndarray[float64]
+        Ángulo de cada qubit (por defecto pi/4, la superposición uniforme).
+    """
+
+    _estado = ('fase',)
+
+    def __init__(self, valores, pesos, fase=math.pi/4, tamano_poblacion=None):
+        self.valores = np.ascontiguousarray(valores, dtype=np.int64)
+        self.pesos = np.ascontiguousarray(pesos, dtype=np.int64)
+        self.tabla = np.column_stack((self.valores, self.pesos)).astype(np.float64)
+        self.fase = np.full(_forma_estado(len(self.valores), tamano_poblacion), fase, dtype=np.float64)
+
+    @property
+    def alpha(self):
+        return np.cos(self.fase)
+
+    @property
+    def beta(self):
+        return np.sin(self.fase)
+
+    def probabilidades(self):
+        """Devuelve la probabilidad de medir 1 en cada qubit (sin**2 de la fase)."""
+        return np.sin(self.fase)**2
+
+    def signos_opuestos(self):
+        """Devuelve la máscara de los qubits con alpha * beta < 0, es decir, con la
+        fase en el segundo o cuarto cuadrante."""
+        return np.mod(self.fase, math.pi) > math.pi/2
+
+    def rotar(self, angulos, mascara=None):
+        """Rota cada qubit sumando su ángulo a la fase (solo los de mascara si se indica)."""
+        if mascara is not None:
+            self.fase[mascara] += angulos
+            return
+        self.fase += angulos
+
+
+def crear_registro(valores, pesos, representacion='amplitudes', tamano_poblacion=None):
+    """Crea el registro de qubits de la instancia con la representación pedida.
+
+    Parámetros
+    ----------
+    valores : [int]
+        Valores de los objetos de la instancia.
+    pesos : [int]
+        Pesos de los objetos de la instancia.
+    representacion : str
+        'amplitudes' (RegistroCuantico, alpha y beta) o 'angulos' (RegistroAngular).
+    tamano_poblacion : int, opcional
+        Número de individuos si el registro representa una población (P, n).
+    """
+    if representacion not in REPRESENTACIONES:
+        raise ValueError(f"representación desconocida: {representacion!r} (se esperaba una de {REPRESENTACIONES})")
+    if representacion == 'angulos':
+        return RegistroAngular(valores, pesos, tamano_poblacion=tamano_poblacion)
+    return RegistroCuantico(valores, pesos, tamano_poblacion=tamano_poblacion)
@@ -0,0 +1,316 @@
+import sys
+import argparse
+import numpy as np
+from pathlib import Path
+from perfil import Perfil
+from instancia import cargar_instancia, EXTENSION_BINARIA
+
+
+MODOS_REPARACION = ('eficiencia', 'aleatoria')
+
+# elementos (filas x objetos) que reparar_lote procesa de una vez
+ELEMENTOS_POR_BLOQUE = 2**18
+
+
+class Reparador:
+    """Motor de reparación de soluciones no factibles de una instancia de la mochila.
+
+    Calcula una sola vez por instancia el orden de los objetos por eficiencia
+    (valor/peso, de mayor a menor) y lo reutiliza en cada reparación.
+
+    Atributos
+    ----------
+    valores : np.ndarray[int64]
+        Valores de los objetos de la instancia.
+    pesos : np.ndarray[int64]
+        Pesos de los objetos de la instancia.
+    modo : str
+        'eficiencia' elimina primero los objetos seleccionados menos eficientes y
+        rellena por orden de eficiencia con el primero que quepa (O(n log n) por
+        instancia). Cada reparación hace una pasada O(n) que deja solo los objetos
+        libres que caben en el hueco y rondas sobre ellos, cada una con el tramo más
+        largo que cabe; el número de rondas suele ser pequeño, pero en el peor caso es
+        O(n·k) con k objetos añadidos. 'aleatoria' mantiene el comportamiento original:
+        elimina objetos al azar y rellena con el primer objeto que quepa.
+    orden : np.ndarray[int64]
+        Índices de los objetos ordenados por eficiencia descendente.
+    rng : np.random.Generator
+        Generador usado por el modo 'aleatoria'.
+    perfil : perfil.Perfil o None
+        Si se indica, cuenta las reparaciones (soluciones que exceden la capacidad)
+        y los objetos quitados y añadidos.
+    """
+
+    def __init__(self, valores, pesos, modo='eficiencia', rng=None, perfil=None):
+        if modo not in MODOS_REPARACION:
+            raise ValueError(f"modo de reparación desconocido: {modo!r} (se esperaba uno de {MODOS_REPARACION})")
+        self.valores = np.asarray(valores, dtype=np.int64)
+        self.pesos = np.asarray(pesos, dtype=np.int64)
+        self.modo = modo
+        self.rng = np.random.default_rng(rng)
+        self.perfil = perfil
+        eficiencia = np.divide(self.valores, self.pesos, out=np.full(len(self.valores), np.inf), where=self.pesos > 0)
+        self.orden = np.argsort(-eficiencia, kind='stable')
+        self.valores_orden = self.valores[self.orden]
+        self.pesos_orden = self.pesos[self.orden]
+        # posición de cada objeto en el orden de eficiencia
+        self.rango = np.empty(len(self.orden), dtype=np.int64)
+        self.rango[self.orden] = np.arange(len(self.orden))
+        # valores en coma flotante para sumarlos con BLAS (exacto por debajo de 2**53,
+        # como RegistroCuantico.tabla)
+        self.valores_reales = self.valores.astype(np.float64)
+        self.filas_por_bloque = max(1, ELEMENTOS_POR_BLOQUE // max(1, len(self.orden)))
+        # pesos para las sumas acumuladas de reparar_lote: int32 si ninguna suma puede desbordarlo
+        tipo = np.int32 if self.pesos.sum() <= np.iinfo(np.int32).max else np.int64
+        self.pesos_orden_acumulables = self.pesos_orden.astype(tipo)
+
+    def reparar(self, solucion, capacidad_max, valor_actual, peso_actual):
+        """Repara la solución (en el sitio) para que no exceda la capacidad y la rellena
+        con los objetos que quepan.
+
+        Parámetros
+        ----------
+        solucion : np.ndarray
+            Solución obtenida de una medición de la población.
+        capacidad_max : int
+            Capacidad máxima de peso de la mochila.
+        valor_actual : int
+            Valor total de la solución a reparar.
+        peso_actual : int
+            Peso total de la solución a reparar.
+
+        Devuelve
+        -------
+        valor_actual : int
+            Valor total de la solución reparada.
+        peso_actual : int
+            Peso total de la solución reparada.
+        """
+        if self.perfil is not None:
+            seleccionados = np.count_nonzero(solucion)
+            if peso_actual > capacidad_max:
+                self.perfil.contar('reparaciones')
+        if self.modo == 'aleatoria':
+            valor_actual, peso_actual, quitados = self._reparar_aleatoria(solucion, capacidad_max, valor_actual, peso_actual)
+        else:
+            valor_actual, peso_actual, quitados = self._reparar_eficiencia(solucion, capacidad_max, valor_actual, peso_actual)
+        if self.perfil is not None:
+            self.perfil.contar('objetos_quitados', quitados)
+            self.perfil.contar('objetos_anadidos', np.count_nonzero(solucion) - seleccionados + quitados)
+        return valor_actual, peso_actual
+
+    def reparar_lote(self, vecindario, filas, capacidad_max, valores, pesos):
+        """Repara a la vez (en el sitio) las filas no factibles de un vecindario.
+
+        En modo 'eficiencia' el resultado es idéntico a reparar cada fila por
+        separado, pero la eliminación se resuelve con una suma acumulada sobre el
+        orden de eficiencia y el relleno trabaja solo con los objetos que caben en
+        el hueco de cada fila, por rondas vectorizadas sobre todas las filas. En
+        modo 'aleatoria' se repara fila a fila.
+
+        Parámetros
+        ----------
+        vecindario : np.ndarray
+            Matriz (P, n) de soluciones, una por fila.
+        filas : np.ndarray[int64]
+            Índices de las filas a reparar.
+        capacidad_max : int
+            Capacidad máxima de peso de la mochila.
+        valores : np.ndarray[int64]
+            Valor total de cada fila del vecindario; se actualiza en las filas reparadas.
+        pesos : np.ndarray[int64]
+            Peso total de cada fila del vecindario; se actualiza en las filas reparadas.
+        """
+        if len(filas) == 0:
+            return
+        if self.modo == 'aleatoria':
+            for i in filas:
+                valores[i], pesos[i] = self.reparar(vecindario[i], capacidad_max, int(valores[i]), int(pesos[i]))
+            return
+
+        # por bloques de filas, para que los temporales (bloque, n) quepan en caché
+        for inicio in range(0, len(filas), self.filas_por_bloque):
+            self._reparar_lote_eficiencia(vecindario, filas[inicio:inicio + self.filas_por_bloque], capacidad_max,
+                                          valores, pesos)
+
+    def _reparar_lote_eficiencia(self, vecindario, filas, capacidad_max, valores, pesos):
+        num_filas = len(filas)
+        bloque = vecindario[filas]
+        seleccion = bloque[:, self.orden] != 0
+        if self.perfil is not None:
+            self.perfil.contar('reparaciones', num_filas)
+            originales = np.count_nonzero(seleccion)
+        # quitar los seleccionados menos eficientes hasta cumplir la restricción equivale
+        # a conservar el tramo inicial de seleccionados (por eficiencia) más largo que cabe
+        acumulado = np.multiply(seleccion, self.pesos_orden_acumulables)
+        np.cumsum(acumulado, axis=1, out=acumulado)
+        fuera = acumulado > capacidad_max
+        # se conservan los seleccionados en las posiciones [0, corte) del orden; como las
+        # filas exceden la capacidad, la última posición siempre queda fuera
+        corte = fuera.argmax(axis=1)
+        conservado = np.where(corte > 0, acumulado[np.arange(num_filas), np.maximum(corte - 1, 0)], 0)
+        hueco = capacidad_max - conservado.astype(np.int64)
+        seleccion &= ~fuera
+        bloque *= self.rango < corte[:, None]
+        if self.perfil is not None:
+            self.perfil.contar('objetos_quitados', originales - np.count_nonzero(seleccion))
+
+        # rellenamos como _reparar_eficiencia, con todas las filas a la vez: solo son
+        # candidatos los libres que caben en el hueco inicial (np.nonzero los agrupa por
+        # fila y en orden de eficiencia) y en cada ronda cada fila toma el tramo más largo
+        # que cabe entero, con una suma acumulada por fila
+        ligeros = np.flatnonzero(self.pesos_orden <= hueco.max())
+        fila, columna = np.nonzero(~seleccion[:, ligeros] & (self.pesos_orden[ligeros] <= hueco[:, None]))
+        columna = ligeros[columna]
+        peso = self.pesos_orden[columna]
+        anadidas = 0
+        while len(fila):
+            acumulado = np.cumsum(peso)
+            primero = np.empty(len(fila), dtype=bool)
+            primero[0] = True
+            np.not_equal(fila[1:], fila[:-1], out=primero[1:])
+            previo = (acumulado - peso)[primero]
+            tomados = acumulado - previo[np.cumsum(primero) - 1] <= hueco[fila]
+            np.subtract.at(hueco, fila[tomados], peso[tomados])
+            bloque[fila[tomados], self.orden[columna[tomados]]] = 1
+            anadidas += np.count_nonzero(tomados)
+            restantes = ~tomados & (peso <= hueco[fila])
+            fila, columna, peso = fila[restantes], columna[restantes], peso[restantes]
+
+        vecindario[filas] = bloque
+        if self.perfil is not None:
+            self.perfil.contar('objetos_anadidos', anadidas)
+        valores[filas] = (bloque @ self.valores_reales).astype(np.int64)
+        pesos[filas] = capacidad_max - hueco
+
+    # las reparaciones fila a fila devuelven (valor, peso, número de objetos quitados)
+
+    def _reparar_eficiencia(self, solucion, capacidad_max, valor_actual, peso_actual):
+        seleccionados = solucion[self.orden] != 0
+        corte = 0
+        if peso_actual > capacidad_max:
+            # quitamos los seleccionados menos eficientes hasta cumplir la restricción
+            candidatos = self.orden[seleccionados][::-1]
+            liberado = np.cumsum(self.pesos[candidatos])
+            corte = int(np.searchsorted(liberado, peso_actual - capacidad_max)) + 1
+            quitados = candidatos[:corte]
+            solucion[quitados] = 0
+            seleccionados = solucion[self.orden] != 0
+            valor_actual -= int(self.valores[quitados].sum())
+            peso_actual -= int(liberado[corte - 1])
+
+        # rellenamos por orden de eficiencia; el hueco nunca crece, así que solo pueden
+        # entrar los objetos libres que caben en el hueco inicial
+        hueco = capacidad_max - peso_actual
+        candidatos = ~seleccionados & (self.pesos_orden <= hueco)
+        libres = self.orden[candidatos]
+        pesos_libres = self.pesos_orden[candidatos]
+        while len(libres):
+            # todos los que quedan caben: se toma el tramo más largo que cabe entero, el
+            # siguiente ya no cabe y se descartan los que tampoco caben en el nuevo hueco
+            acumulado = np.cumsum(pesos_libres)
+            tomados = int(np.searchsorted(acumulado, hueco, side='right'))
+            solucion[libres[:tomados]] = 1
+            valor_actual += int(self.valores[libres[:tomados]].sum())
+            hueco -= int(acumulado[tomados - 1])
+            restantes = pesos_libres[tomados + 1:] <= hueco
+            libres = libres[tomados + 1:][restantes]
+            pesos_libres = pesos_libres[tomados + 1:][restantes]
+        return valor_actual, capacidad_max - hueco, corte
+
+    def _reparar_aleatoria(self, solucion, capacidad_max, valor_actual, peso_actual):
+        corte = 0
+        if peso_actual > capacidad_max:
+            # quitar seleccionados al azar hasta cumplir la restricción equivale a
+            # recorrerlos en un orden aleatorio: se baraja una vez en lugar de
+            # sortear índices hasta dar con uno seleccionado
+            candidatos = self.rng.permutation(np.flatnonzero(solucion))
+            liberado = np.cumsum(self.pesos[candidatos])
+            corte = int(np.searchsorted(liberado, peso_actual - capacidad_max)) + 1
+            quitados = candidatos[:corte]
+            solucion[quitados] = 0
+            valor_actual -= int(self.valores[quitados].sum())
+            peso_actual -= int(liberado[corte - 1])
+
+        # Luego intenta rellenar objetos que quepan, de forma codiciosa
+        while True:
+            candidatos = np.flatnonzero((solucion == 0) & (self.pesos <= capacidad_max - peso_actual))
+            if len(candidatos) == 0:
+                break
+            i = candidatos[0]
+            solucion[i] = 1
+            valor_actual += int(self.valores[i])
+            peso_actual += int(self.pesos[i])
+        return valor_actual, peso_actual, corte
+
+
+def comprobar(instancia, num_filas=200, densidades=(0.02, 0.2, 0.5, 0.9), semilla=0):
+    """Compara reparar_lote con reparar fila a fila (modo 'eficiencia') sobre
+    soluciones aleatorias de una instancia.
+
+    Parámetros
+    ----------
+    instancia : Instancia
+        Instancia cuyos objetos se usan.
+    num_filas : int
+        Soluciones aleatorias por densidad.
+    densidades : tuple[float]
+        Fracciones de objetos elegidos en las soluciones aleatorias.
+    semilla : int
+        Semilla de las soluciones aleatorias.
+
+    Devuelve
+    -------
+    fallos : [float]
+        Densidades en las que no coinciden las soluciones reparadas, sus valores
+        y pesos o los contadores del perfil.
+    """
+    rng = np.random.default_rng(semilla)
+    valores = np.asarray(instancia.valores, dtype=np.int64)
+    pesos = np.asarray(instancia.pesos, dtype=np.int64)
+    capacidad_max = instancia.capacidad
+    fallos = []
+    for densidad in densidades:
+        soluciones = (rng.random((num_filas, len(valores))) < densidad).view(np.uint8)
+        valores_soluciones = soluciones @ valores
+        pesos_soluciones = soluciones @ pesos
+        filas = np.flatnonzero(pesos_soluciones > capacidad_max)
+        resultados = []
+        for en_lote in (True, False):
+            perfil = Perfil()
+            reparador = Reparador(valores, pesos, perfil=perfil)
+            vecindario = soluciones.copy()
+            valores_filas, pesos_filas = valores_soluciones.copy(), pesos_soluciones.copy()
+            if en_lote:
+                reparador.reparar_lote(vecindario, filas, capacidad_max, valores_filas, pesos_filas)
+            else:
+                for i in filas:
+                    valores_filas[i], pesos_filas[i] = reparador.reparar(vecindario[i], capacidad_max,
+                                                                         int(valores_filas[i]), int(pesos_filas[i]))
+            resultados.append((vecindario, valores_filas, pesos_filas, perfil.contadores))
+        (lote, valores_lote, pesos_lote, contadores_lote), (fila, valores_fila, pesos_fila, contadores_fila) = resultados
+        if not (np.array_equal(lote, fila) and np.array_equal(valores_lote, valores_fila)
+                and np.array_equal(pesos_lote, pesos_fila) and contadores_lote == contadores_fila):
+            fallos.append(densidad)
+    return fallos
+
+
+if __name__ == '__main__':
+    # Uso: python reparacion.py [--datos data] [--filas 200]
+    parser = argparse.ArgumentParser(description='Comprueba que reparar_lote repara igual que reparar fila a fila.')
+    parser.add_argument('--datos', type=Path, default=Path('data'), help='directorio con las instancias CSV o .knap')
+    parser.add_argument('--filas', type=int, default=200, help='soluciones aleatorias por densidad')
+    argumentos = parser.parse_args()
+
+    archivos = sorted(archivo for archivo in argumentos.datos.iterdir()
+                      if archivo.suffix in ('.csv', EXTENSION_BINARIA))
+    incorrectas = []
+    for archivo in archivos:
+        fallos = comprobar(cargar_instancia(archivo), argumentos.filas)
+        print(f'{archivo.name}: ' + ('correcto' if not fallos else f'distinto con densidades {fallos}'))
+        if fallos:
+            incorrectas.append(archivo.name)
+    if incorrectas:
+        print('reparar_lote no coincide con reparar en: ' + ', '.join(incorrectas))
+        sys.exit(1)
+    print('reparar_lote coincide con reparar')
@@ -1,67 +1,72 @@
-import numpy as np
 import math
 from pathlib import Path
 import matplotlib.pyplot as plt
-from QTS import QTS
-from QEA import QEA
-from AE_QTS import AE_QTS
-from multiprocessing import Pool, cpu_count
-from GA import genetic_algorithm
+from instancia import cargar_instancia
+from memoria_compartida import instancia_compartida
+from almacen import AlmacenResultados
+from planificador import (planificar, ejecutar_barrido, recuperar_completadas, HistorialesCompartidos,
+                          con_tiempo_limite, eje_historial)
 
 
 # Parámetros
 num_runs = 100
 num_generaciones = 1000
+# semilla del barrido: cada ejecución recibe un flujo independiente derivado de ella
+# con SeedSequence.spawn (None usa entropía nueva del sistema en cada barrido)
+semilla = None
+# procesos del barrido (None: tantos como núcleos) y tareas por entrega (None: automático)
+num_procesos = None
+tamano_lote = None
+# cada ejecución terminada se guarda en directorio_resultados y, al relanzar el
+# barrido, las ya hechas se leen de ahí (para empezar de cero, borrar el directorio);
+# con periodo_control los solvers guardan además su estado cada tantas iteraciones
+directorio_resultados = Path('./resultados')
+periodo_control = None
+# presupuesto de tiempo por ejecución en segundos: si se indica, todos los algoritmos se
+# comparan a igual tiempo (historial muestreado en el tiempo) en lugar de a igual número
+# de generaciones
+tiempo_limite = None
 #instancia_mochila = Path('./data/toyProblemInstance_100.csv')
 #instancia_mochila = Path('./data/toyProblemInstance_250.csv')
 instancia_mochila = Path('./data/toyProblemInstance_500.csv')
 #instancia_mochila = Path('./data/knapPI_13_500_1000_1.csv')
 #instancia_mochila = Path('data/knapPI_1_5000_1000000_1.csv')
 
-# Función que ejecuta una corrida completa
-def run_algorithms(_):
-    ae_qt1 = QTS(num_generaciones, 0.2 * math.pi, 10, 2)
-    ae_qt2 = QTS(num_generaciones, 0.1 * math.pi, 10, 2)
-    ae_qt3 = QTS(num_generaciones, 0.05 * math.pi, 10, 2)
-    ae_qt4 = QTS(num_generaciones, 0.01 * math.pi, 10, 2)
-    
-    
-    _, _, historial_qea = ae_qt1.run(instancia_mochila)
-    _, _, historial_qts = ae_qt2.run(instancia_mochila)
-    _,_, historial_ae_qts = ae_qt3.run(instancia_mochila)
-    _,_, historial_ga = ae_qt4.run(instancia_mochila)
-    
-    
-    return historial_qts, historial_qea, historial_ae_qts,historial_ga
+# Un experimento por valor de theta; cada ejecución es una tarea independiente y
+# para al alcanzar el óptimo conocido (su historial se completa con él)
+experimentos = [
+    (f'AE_QTS_{factor}', 'QTS', dict(iteraciones=num_generaciones, theta=factor * math.pi, tamano_poblacion=10, itt_tabu=2, parar_en_optimo=True))
+    for factor in (0.2, 0.1, 0.05, 0.01)
+]
 
+if tiempo_limite is not None:
+    experimentos = con_tiempo_limite(experimentos, tiempo_limite)
 
 if __name__ == '__main__':
-    # Usar tantos procesos como núcleos disponibles
-    with Pool(processes=min(cpu_count(), num_runs)) as pool:
-        resultados = pool.map(run_algorithms, range(num_runs))
+    instancia = cargar_instancia(instancia_mochila)
+    almacen = AlmacenResultados(directorio_resultados / Path(__file__).stem, instancia, periodo_control)
+    tareas = planificar(experimentos, num_runs, len(instancia), almacen.semilla_barrido(semilla))
+    # Los trabajadores escriben cada historial en memoria compartida y las
+    # medias se acumulan en línea según terminan las tareas, en cualquier orden
+    with instancia_compartida(instancia) as descriptor, HistorialesCompartidos(experimentos, num_runs) as historiales:
+        pendientes = recuperar_completadas(tareas, historiales, almacen)
+        for etiqueta, ejecucion in ejecutar_barrido(pendientes, descriptor, historiales, num_procesos, tamano_lote, almacen):
+            historiales.registrar(etiqueta, ejecucion)
+        medias = {etiqueta: estadisticas.media for etiqueta, estadisticas in historiales.estadisticas.items()}
 
-    # Separar los historiales en listas distintas
-    historiales_qts, historiales_qea,historiales_ae_qts,historiales_ga, = zip(*resultados)
-
-    # Convertir a arrays
-    historiales_qts_np = np.array(historiales_qts)
-    historiales_qea_np = np.array(historiales_qea)
-    historiales_ae_qts_np = np.array(historiales_ae_qts)
-    historiales_ga_np = np.array(historiales_ga)
-    # Calcular medias
-    media_qts = np.mean(historiales_qts_np, axis=0)
-    media_qea = np.mean(historiales_qea_np, axis=0)
-    media_ae_qts = np.mean(historiales_ae_qts_np, axis=0)
-    media_ga = np.mean(historiales_ga_np,axis=0)
-
-    # Graficar
-    plt.plot(media_qts, marker='o', linestyle='-', color='b', label='AE_QTS_0.2')
-    plt.plot(media_qea, marker='s', linestyle='--', color='r', label='AE_QTS_0.1')
-    plt.plot(media_ae_qts, marker='o', linestyle='-', color='y', label='AE_QTS_0.05')
-    plt.plot(media_ga, marker='o', linestyle='-', color='g', label='AE_QTS_0.01')
+    # Media por generación de cada experimento, con su propia etiqueta
+    estilos = {
+        'AE_QTS_0.2': dict(marker='o', linestyle='-', color='b'),
+        'AE_QTS_0.1': dict(marker='s', linestyle='--', color='r'),
+        'AE_QTS_0.05': dict(marker='o', linestyle='-', color='y'),
+        'AE_QTS_0.01': dict(marker='o', linestyle='-', color='g'),
+    }
+    for etiqueta, _, _ in experimentos:
+        media = medias[etiqueta]
+        plt.plot(eje_historial(len(media), tiempo_limite), media, label=etiqueta, **estilos[etiqueta])
 
     plt.title(f'Fitness promedio durante {num_runs} ejecuciones')
-    plt.xlabel('Generación')
+    plt.xlabel('Generación' if tiempo_limite is None else 'Tiempo (s)')
     plt.ylabel('Fitness promedio')
     plt.grid(True)
     plt.legend()